@@ -5,4 +5,12 @@ from .models import Address
 
 @admin.register(Address)
 class AddressAdmin(admin.ModelAdmin):
-    pass
+    list_display = [
+        'address',
+        'longitude',
+        'latitude',
+        'fetched_at',
+    ]
+    search_fields = [
+        'address',
+    ]
@@ -0,0 +1,55 @@
+"""Local HTTP server answering like Yandex.Geocoder, for offline load testing.
+
+Coordinates are derived from a hash of the address, so the same address
+always gets the same point. Addresses containing "nowhere" are not found.
+"""
+import hashlib
+import json
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+MOSCOW_BBOX = (37.35, 55.55, 37.85, 55.92)
+
+
+def get_fake_coordinates(address: str, bbox: tuple = MOSCOW_BBOX) -> tuple[float, float]:
+    min_lon, min_lat, max_lon, max_lat = bbox
+    digest = hashlib.sha256(address.encode('utf-8')).digest()
+    lon_share = int.from_bytes(digest[:4], 'big') / 0xFFFFFFFF
+    lat_share = int.from_bytes(digest[4:8], 'big') / 0xFFFFFFFF
+    return (round(min_lon + (max_lon - min_lon) * lon_share, 6),
+            round(min_lat + (max_lat - min_lat) * lat_share, 6))
+
+
+class FakeGeocoderHandler(BaseHTTPRequestHandler):
+    latency = 0.0
+
+    def do_GET(self):
+        address = parse_qs(urlparse(self.path).query).get('geocode', [''])[0]
+        time.sleep(self.latency)
+
+        found_places = []
+        if address and 'nowhere' not in address:
+            lon, lat = get_fake_coordinates(address)
+            found_places.append({'GeoObject': {'Point': {'pos': f'{lon} {lat}'}}})
+        body = json.dumps({
+            'response': {'GeoObjectCollection': {'featureMember': found_places}}
+        }).encode('utf-8')
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_fake_geocoder_server(host: str = '127.0.0.1', port: int = 0, latency: float = 0.0) -> ThreadingHTTPServer:
+    """Create server, port 0 means any free port: see server.server_address."""
+    handler = type('FakeGeocoderHandler', (FakeGeocoderHandler,), {'latency': latency})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
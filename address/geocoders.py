@@ -0,0 +1,117 @@
+"""Geocoder backends. Backend is selected by GEOCODER_BACKEND setting."""
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import requests
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+from address.fake_geocoder import get_fake_coordinates
+from address.services import create_session, fetch_coordinates
+from address.signals import geocoder_called
+
+
+logger = logging.getLogger(__name__)
+
+
+class GeocoderError(Exception):
+    """Address was not geocoded now, but may be geocoded later."""
+
+
+class BaseGeocoder:
+    """Backend interface: implement geocode, override geocode_batch if geocoder has batch API."""
+
+    def __init__(self, max_workers: int = None, deadline: float = None):
+        self.max_workers = max_workers or settings.GEOCODER_MAX_WORKERS
+        self.deadline = deadline if deadline is not None else settings.GEOCODER_DEADLINE
+
+    def geocode(self, address: str) -> tuple[float, float] | None:
+        """Return (lon, lat) or None if address is not found. Raise GeocoderError on failure."""
+        raise NotImplementedError
+
+    def geocode_with_stats(self, address: str) -> tuple[float, float] | None:
+        started_at = time.monotonic()
+        result = 'error'
+        try:
+            coordinates = self.geocode(address)
+            result = 'not_found' if coordinates is None else 'found'
+        finally:
+            geocoder_called.send(sender=type(self), result=result, duration=time.monotonic() - started_at)
+        return coordinates
+
+    def geocode_batch(self, addresses: set, deadline: float = None) -> tuple[dict, set]:
+        """Geocode addresses in a thread pool.
+        :return: dict address -> coordinates (None if geocoder did not find address) and
+        set of pending addresses, which failed or were not geocoded before deadline.
+        Any error of an address, e.g. on unexpected response, only leaves this address pending."""
+        if not addresses:
+            return {}, set()
+        deadline = deadline if deadline is not None else self.deadline
+
+        executor = ThreadPoolExecutor(max_workers=min(self.max_workers, len(addresses)))
+        futures = {executor.submit(self.geocode_with_stats, address): address for address in addresses}
+        done, not_done = wait(futures, timeout=deadline)
+        executor.shutdown(wait=False, cancel_futures=True)
+
+        addresses_with_coord = {}
+        pending_addresses = {futures[future] for future in not_done}
+        for future in done:
+            address = futures[future]
+            try:
+                addresses_with_coord[address] = future.result()
+            except Exception:
+                logger.exception('Address %s was not geocoded', address)
+                pending_addresses.add(address)
+        return addresses_with_coord, pending_addresses
+
+
+class YandexGeocoder(BaseGeocoder):
+    def __init__(self, apikey: str = None, url: str = None, timeout: float = None, **kwargs):
+        super().__init__(**kwargs)
+        self.apikey = apikey or settings.YANDEX_API_KEY
+        self.url = url or settings.GEOCODER_URL
+        self.timeout = timeout if timeout is not None else settings.GEOCODER_TIMEOUT
+        self.session = create_session(self.max_workers)
+
+    def geocode(self, address: str) -> tuple[float, float] | None:
+        try:
+            return fetch_coordinates(self.apikey, address, timeout=self.timeout,
+                                     base_url=self.url, session=self.session)
+        except requests.RequestException as error:
+            raise GeocoderError(address) from error
+
+
+class FakeGeocoder(BaseGeocoder):
+    """Offline geocoder for load testing.
+    Coordinates are a hash of address inside bounding box, addresses containing "nowhere" are not found."""
+
+    def __init__(self, latency: float = None, bbox: tuple = None, **kwargs):
+        super().__init__(**kwargs)
+        self.latency = latency if latency is not None else settings.GEOCODER_FAKE_LATENCY
+        self.bbox = tuple(bbox or settings.GEOCODER_FAKE_BBOX)
+
+    def geocode(self, address: str) -> tuple[float, float] | None:
+        time.sleep(self.latency)
+        if 'nowhere' in address:
+            return None
+        return get_fake_coordinates(address, self.bbox)
+
+
+_geocoder = None
+
+
+def get_geocoder() -> BaseGeocoder:
+    global _geocoder
+    if _geocoder is None:
+        _geocoder = import_string(settings.GEOCODER_BACKEND)()
+    return _geocoder
+
+
+@receiver(setting_changed)
+def reset_geocoder(setting, **kwargs):
+    global _geocoder
+    if setting.startswith('GEOCODER_') or setting == 'YANDEX_API_KEY':
+        _geocoder = None
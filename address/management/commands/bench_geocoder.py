@@ -0,0 +1,44 @@
+import threading
+from timeit import default_timer
+
+from django.core.management.base import BaseCommand
+
+from address.fake_geocoder import make_fake_geocoder_server
+from address.geocoders import YandexGeocoder
+
+
+class Command(BaseCommand):
+    help = 'Compare sequential and pooled geocoding against local fake geocoder'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--addresses', type=int, default=20)
+        parser.add_argument('--latency', type=float, default=0.1, help='seconds per geocoder request')
+        parser.add_argument('--workers', type=int, default=8)
+        parser.add_argument('--deadline', type=float, default=30)
+
+    def handle(self, *args, **options):
+        server = make_fake_geocoder_server(latency=options['latency'])
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        host, port = server.server_address
+        base_url = f'http://{host}:{port}/1.x'
+        addresses = {f'Москва, улица Бенчмарка, {number}' for number in range(options['addresses'])}
+
+        geocoder = YandexGeocoder(apikey='fake', url=base_url, timeout=5,
+                                  max_workers=options['workers'], deadline=options['deadline'])
+
+        started_at = default_timer()
+        for address in addresses:
+            geocoder.geocode(address)
+        sequential_time = default_timer() - started_at
+
+        started_at = default_timer()
+        found, pending = geocoder.geocode_batch(addresses)
+        pooled_time = default_timer() - started_at
+        server.shutdown()
+
+        count = len(addresses)
+        self.stdout.write(
+            f'{count} addresses: sequential {sequential_time:.2f} s ({count / sequential_time:.1f} addr/s), '
+            f'pooled x{options["workers"]} {pooled_time:.2f} s ({count / pooled_time:.1f} addr/s), '
+            f'found {len(found)}, pending {len(pending)}'
+        )
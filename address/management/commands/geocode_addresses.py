@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import F
+from django.utils import timezone
+
+from address.models import Address
+
+
+class Command(BaseCommand):
+    help = 'Geocode enqueued addresses and addresses with expired coordinates'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50)
+        parser.add_argument('--loop', action='store_true', help='process queue forever')
+        parser.add_argument('--interval', type=float, default=5, help='seconds to sleep when queue is empty')
+
+    def handle(self, *args, **options):
+        while True:
+            addresses = set(
+                Address.objects
+                .pending(timezone.now())
+                .order_by(F('fetched_at').asc(nulls_first=True))
+                .values_list('address', flat=True)[:options['batch_size']]
+            )
+            if addresses:
+                not_geocoded = Address.objects.geocode(addresses)
+                self.stdout.write(f'Geocoded {len(addresses) - len(not_geocoded)} of {len(addresses)} addresses')
+
+            if not options['loop']:
+                return
+            if not addresses or len(not_geocoded) == len(addresses):
+                time.sleep(options['interval'])
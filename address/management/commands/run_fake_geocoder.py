@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from address.fake_geocoder import make_fake_geocoder_server
+
+
+class Command(BaseCommand):
+    help = 'Run local server answering like Yandex.Geocoder. Point GEOCODER_URL to it.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8001)
+        parser.add_argument('--latency', type=float, default=0.1, help='seconds per request')
+
+    def handle(self, *args, **options):
+        server = make_fake_geocoder_server(options['host'], options['port'], options['latency'])
+        host, port = server.server_address
+        self.stdout.write(f'Fake geocoder is listening at http://{host}:{port}/1.x')
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            server.server_close()
@@ -0,0 +1,26 @@
+# Generated by Django 3.2.10 on 2026-10-18 18:22
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def set_fetched_at(apps, schema_editor):
+    """Existing addresses are treated as freshly fetched to avoid geocoding all of them at once."""
+    Address = apps.get_model('address', 'Address')
+    Address.objects.filter(fetched_at__isnull=True).update(fetched_at=timezone.now())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('address', '0002_auto_20220606_0906'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='address',
+            name='fetched_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True, verbose_name='Когда запрошены координаты'),
+        ),
+        migrations.RunPython(set_fetched_at, migrations.RunPython.noop),
+    ]
@@ -1,38 +1,106 @@
+import time
+from datetime import timedelta
+
 from django.conf import settings
 from django.db import models
+from django.db.models import Q
+from django.utils import timezone
+
+from address.geocoders import get_geocoder
+from address.services import geocoder_cache
+from address.signals import coordinates_updated, geocoder_cache_looked_up
+
 
-from address.services import fetch_coordinates
+def get_ttl(coordinates) -> int:
+    if coordinates is None:
+        return settings.GEOCODER_NOT_FOUND_TTL
+    return settings.GEOCODER_CACHE_TTL
 
 
 class AddressQuerySet(models.QuerySet):
 
-    def get_or_create_addresses_with_coord(self, order_and_rest_addresses: set) -> dict[str]:
-        """Return existing and fetched addresses with coordinates.
-        If address is absent in DB, it's requested in Yandex.Geocoder and save to DB."""
-        existing_addresses = (self.filter(address__in=order_and_rest_addresses)
-                              .values_list('address', 'longitude', 'latitude'))
-
-        addresses_with_coord = {address: (longitude, latitude)
-                                for address, longitude, latitude
-                                in existing_addresses}
-        new_addresses = []
-        for address in order_and_rest_addresses ^ set(addresses_with_coord):
-            lon, lat = fetch_coordinates(settings.YANDEX_API_KEY, address)
-            addresses_with_coord[address] = (lon, lat)
-            new_addresses.append({
-                'address': address,
-                'longitude': lon,
-                'latitude': lat,
-            })
-
-        Address.objects.bulk_create([Address(**fields) for fields in new_addresses])
+    def pending(self, now):
+        """Addresses enqueued for geocoding and addresses with expired coordinates."""
+        return self.filter(
+            Q(fetched_at__isnull=True)
+            | Q(latitude__isnull=True, fetched_at__lte=now - timedelta(seconds=settings.GEOCODER_NOT_FOUND_TTL))
+            | Q(fetched_at__lte=now - timedelta(seconds=settings.GEOCODER_CACHE_TTL))
+        )
+
+    def enqueue(self, addresses) -> None:
+        """Add addresses to geocoding queue, which is processed by geocode_addresses command."""
+        self.bulk_create([Address(address=address) for address in addresses], ignore_conflicts=True)
+
+    def get_addresses_with_coord(self, addresses: set) -> dict[str]:
+        """Return addresses with coordinates, looked up in the in-process cache, then in DB.
+        Geocoder is never requested here: unknown addresses are enqueued for geocoding and
+        are absent in result as well as addresses waiting in the queue.
+        Not found addresses have None coordinates."""
+        addresses_with_coord = {}
+        missing_addresses = set()
+        for address in addresses:
+            is_cached, coordinates = geocoder_cache.get(address)
+            if is_cached:
+                addresses_with_coord[address] = coordinates
+            else:
+                missing_addresses.add(address)
+        hits = len(addresses_with_coord)
+
+        now = timezone.now()
+        existing_addresses = (self.filter(address__in=missing_addresses)
+                              .values_list('address', 'longitude', 'latitude', 'fetched_at')
+                              if missing_addresses else [])
+        for address, longitude, latitude, fetched_at in existing_addresses:
+            missing_addresses.discard(address)
+            if fetched_at is None:
+                continue
+            coordinates = (longitude, latitude) if longitude is not None and latitude is not None else None
+            addresses_with_coord[address] = coordinates
+            expires_at = fetched_at + timedelta(seconds=get_ttl(coordinates))
+            if expires_at > now:
+                geocoder_cache.set(address, coordinates, expires_at.timestamp())
+
+        geocoder_cache_looked_up.send(
+            sender=self.model,
+            hits=hits,
+            db_hits=len(addresses_with_coord) - hits,
+            misses=len(addresses) - len(addresses_with_coord),
+        )
+        self.enqueue(missing_addresses)
         return addresses_with_coord
 
+    def geocode(self, addresses: set) -> set:
+        """Fetch coordinates of addresses and save them to DB.
+        Not found addresses are saved with None coordinates,
+        so they are not requested again until their TTL expires.
+        :return: addresses which were not geocoded."""
+        fetched_coordinates, pending_addresses = get_geocoder().geocode_batch(addresses)
+
+        now = timezone.now()
+        existing_pks = dict(self.filter(address__in=fetched_coordinates).values_list('address', 'pk'))
+        fetched_addresses = []
+        for address, coordinates in fetched_coordinates.items():
+            geocoder_cache.set(address, coordinates, time.time() + get_ttl(coordinates))
+            lon, lat = coordinates or (None, None)
+            fetched_addresses.append(
+                Address(pk=existing_pks.get(address), address=address,
+                        longitude=lon, latitude=lat, fetched_at=now)
+            )
+
+        Address.objects.bulk_create([address for address in fetched_addresses if address.pk is None],
+                                    ignore_conflicts=True)
+        Address.objects.bulk_update([address for address in fetched_addresses if address.pk is not None],
+                                    ['longitude', 'latitude', 'fetched_at'])
+        if fetched_coordinates:
+            coordinates_updated.send(sender=Address, addresses=set(fetched_coordinates))
+        return pending_addresses
+
 
 class Address(models.Model):
     address = models.CharField('Адрес', max_length=200, unique=True, db_index=True)
     latitude = models.FloatField('Координаты широты', null=True, blank=True)
     longitude = models.FloatField('Координаты долготы', null=True, blank=True)
+    fetched_at = models.DateTimeField('Когда запрошены координаты', null=True, blank=True, db_index=True)
 
     objects = AddressQuerySet.as_manager()
 
@@ -1,14 +1,66 @@
+import time
+from collections import OrderedDict
+from threading import Lock
+
 import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+
+class GeocoderCache:
+    """In-process LRU of geocoded addresses with per-entry TTL.
+    Coordinates None are stored too: it means that geocoder did not find the address."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, address: str) -> tuple[bool, tuple[float, float] | None]:
+        """Return (is_found_in_cache, coordinates)."""
+        with self._lock:
+            entry = self._entries.get(address)
+            if entry is None:
+                return False, None
+            coordinates, expires_at = entry
+            if expires_at <= time.time():
+                del self._entries[address]
+                return False, None
+            self._entries.move_to_end(address)
+            return True, coordinates
+
+    def set(self, address: str, coordinates: tuple[float, float] | None, expires_at: float) -> None:
+        with self._lock:
+            self._entries[address] = (coordinates, expires_at)
+            self._entries.move_to_end(address)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+geocoder_cache = GeocoderCache(maxsize=settings.GEOCODER_CACHE_SIZE)
+
+
+def create_session(pool_size: int) -> requests.Session:
+    """Session keeps connections to geocoder alive between requests and threads."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
 
 
-def fetch_coordinates(apikey: str, address: str) -> tuple[int, int] | None:
-    """Fetch coordinates of address."""
-    base_url = "https://geocode-maps.yandex.ru/1.x"
-    response = requests.get(base_url, params={
+def fetch_coordinates(apikey: str, address: str, timeout: float = None,
+                      base_url: str = None, session: requests.Session = None) -> tuple[float, float] | None:
+    """Fetch coordinates of address from Yandex.Geocoder."""
+    response = (session or requests).get(base_url or settings.GEOCODER_URL, params={
         "geocode": address,
         "apikey": apikey,
         "format": "json",
-    })
+    }, timeout=timeout)
     response.raise_for_status()
     found_places = response.json()['response']['GeoObjectCollection']['featureMember']
 
@@ -17,4 +69,4 @@ def fetch_coordinates(apikey: str, address: str) -> tuple[int, int] | None:
 
     most_relevant = found_places[0]
     lon, lat = most_relevant['GeoObject']['Point']['pos'].split(" ")
-    return lon, lat
+    return float(lon), float(lat)
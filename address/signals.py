@@ -0,0 +1,12 @@
+from django.dispatch import Signal
+
+
+# Sent when coordinates of addresses are saved by geocoder. Provides "addresses" argument.
+coordinates_updated = Signal()
+
+# Sent after every geocoder request. Provides "result" ("found", "not_found" or "error") and "duration" in seconds.
+geocoder_called = Signal()
+
+# Sent after addresses are looked up in the in-process cache and DB.
+# Provides "hits", "db_hits" and "misses" numbers of addresses.
+geocoder_cache_looked_up = Signal()
@@ -1,3 +1,111 @@
-from django.test import TestCase
+import threading
+import time
+from datetime import timedelta
 
-# Create your tests here.
+from django.conf import settings
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from .fake_geocoder import get_fake_coordinates
+from .geocoders import BaseGeocoder, GeocoderError
+from .models import Address
+from .services import GeocoderCache, geocoder_cache
+
+
+class GeocoderCacheTest(SimpleTestCase):
+
+    def test_hit_and_expiration(self):
+        cache = GeocoderCache(maxsize=10)
+        cache.set('Москва, Тверская 1', (37.61, 55.76), time.time() + 60)
+        cache.set('Москва, Арбат 1', (37.59, 55.75), time.time() - 1)
+
+        self.assertEqual(cache.get('Москва, Тверская 1'), (True, (37.61, 55.76)))
+        self.assertEqual(cache.get('Москва, Арбат 1'), (False, None))
+        self.assertEqual(cache.get('Москва, Неизвестная 1'), (False, None))
+
+    def test_not_found_is_cached(self):
+        cache = GeocoderCache(maxsize=10)
+        cache.set('nowhere', None, time.time() + 60)
+        self.assertEqual(cache.get('nowhere'), (True, None))
+
+    def test_least_recently_used_are_evicted(self):
+        cache = GeocoderCache(maxsize=2)
+        for number in range(3):
+            cache.set(f'адрес {number}', (37.0, 55.0 + number), time.time() + 60)
+            cache.get('адрес 0')
+        self.assertEqual([cache.get(f'адрес {number}')[0] for number in range(3)], [True, False, True])
+
+
+@override_settings(GEOCODER_BACKEND='address.geocoders.FakeGeocoder', GEOCODER_FAKE_LATENCY=0)
+class AddressGeocodingTest(TestCase):
+
+    def setUp(self):
+        geocoder_cache.clear()
+
+    def test_found_and_not_found_addresses(self):
+        addresses = {'Москва, Тверская 1', 'nowhere 1'}
+        self.assertEqual(Address.objects.get_addresses_with_coord(addresses), {})
+        self.assertEqual(set(Address.objects.pending(timezone.now()).values_list('address', flat=True)), addresses)
+
+        self.assertEqual(Address.objects.geocode(addresses), set())
+        expected = {
+            'Москва, Тверская 1': get_fake_coordinates('Москва, Тверская 1', tuple(settings.GEOCODER_FAKE_BBOX)),
+            'nowhere 1': None,
+        }
+        self.assertEqual(Address.objects.get_addresses_with_coord(addresses), expected)
+
+        geocoder_cache.clear()
+        with self.assertNumQueries(1):
+            self.assertEqual(Address.objects.get_addresses_with_coord(addresses), expected)
+        with self.assertNumQueries(0):
+            self.assertEqual(Address.objects.get_addresses_with_coord(addresses), expected)
+
+    def test_not_found_ttl(self):
+        now = timezone.now()
+        not_found_ttl = timedelta(seconds=settings.GEOCODER_NOT_FOUND_TTL)
+        Address.objects.bulk_create([
+            Address(address='nowhere 1', fetched_at=now - not_found_ttl + timedelta(minutes=1)),
+            Address(address='nowhere 2', fetched_at=now - not_found_ttl - timedelta(minutes=1)),
+            Address(address='Москва, Тверская 1', longitude=37.61, latitude=55.76,
+                    fetched_at=now - not_found_ttl - timedelta(minutes=1)),
+        ])
+
+        self.assertEqual(list(Address.objects.pending(now).values_list('address', flat=True)), ['nowhere 2'])
+        addresses = Address.objects.get_addresses_with_coord({'nowhere 1', 'nowhere 2'})
+        self.assertEqual(addresses, {'nowhere 1': None, 'nowhere 2': None})
+        # expired not found address is not cached in process, so it is looked up in DB again
+        self.assertEqual(geocoder_cache.get('nowhere 1'), (True, None))
+        self.assertEqual(geocoder_cache.get('nowhere 2'), (False, None))
+
+
+class FlakyGeocoder(BaseGeocoder):
+    """Hangs on addresses with "slow", fails on addresses with "error" or "broken"."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.released = threading.Event()
+
+    def geocode(self, address: str) -> tuple[float, float] | None:
+        if 'slow' in address:
+            self.released.wait(5)
+        if 'error' in address:
+            raise GeocoderError(address)
+        if 'broken' in address:
+            raise KeyError('featureMember')
+        return 37.61, 55.76
+
+
+class GeocodeBatchTest(SimpleTestCase):
+
+    def test_deadline_and_errors(self):
+        geocoder = FlakyGeocoder(max_workers=4, deadline=0.2)
+        addresses = {'Тверская 1', 'slow 1', 'error 1', 'broken 1'}
+        started_at = time.monotonic()
+        with self.assertLogs('address.geocoders', 'ERROR') as logs:
+            addresses_with_coord, pending_addresses = geocoder.geocode_batch(addresses)
+        geocoder.released.set()
+
+        self.assertLess(time.monotonic() - started_at, 2)
+        self.assertEqual(addresses_with_coord, {'Тверская 1': (37.61, 55.76)})
+        self.assertEqual(pending_addresses, {'slow 1', 'error 1', 'broken 1'})
+        self.assertEqual(len(logs.records), 2)
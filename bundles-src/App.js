@@ -13,6 +13,9 @@ import NoResults from "./components/NoResults";
 
 import './css/App.css';
 
+const PRODUCTS_PAGE_SIZE = 24;
+const PRODUCTS_MAX_PAGE_SIZE = 500;  // max limit accepted by /api/products/
+
 class App extends Component {
 
   constructor(props){
@@ -102,8 +105,12 @@ class App extends Component {
   }
 
 
-  async getProducts(){
-    let response = await fetch('/api/products/', {
+  async getProductsPage(cursor, limit){
+    let url = `/api/products/?limit=${limit}`;
+    if (cursor !== null){
+      url += `&cursor=${cursor}`;
+    }
+    let response = await fetch(url, {
       headers: {
         'Accept': 'application/json',
         'Content-Type': 'application/json',
@@ -111,13 +118,27 @@ class App extends Component {
     });
 
     if (!response.ok){
-      return;
+      return null;
     }
+    return await response.json();
+  }
 
-    let data = await response.json();
-    this.setState({
-      products : data
-    });
+  async getProducts(){
+    // first screen is rendered as soon as first page arrives,
+    // the rest is loaded in background by one request of the biggest page
+    let cursor = null;
+    let limit = PRODUCTS_PAGE_SIZE;
+    do {
+      let page = await this.getProductsPage(cursor, limit);
+      if (!page){
+        return;
+      }
+      limit = PRODUCTS_MAX_PAGE_SIZE;
+      this.setState(state => ({
+        products : [...(state.products || []), ...page.results]
+      }));
+      cursor = page.next_cursor;
+    } while (cursor !== null);
   }
 
   async getBanners(){
@@ -1,18 +1,22 @@
 from django.conf import settings
 from django.contrib import admin
+from django.db import transaction
+from django.db.models import Case, When
 from django.http import HttpResponseRedirect
 from django.shortcuts import reverse
 from django.templatetags.static import static
 from django.utils.html import format_html
 from django.utils.http import url_has_allowed_host_and_scheme
 
-from restaurateur.views import get_restaurants_with_available_products
+from address.models import Address
 
-from .models import Product, Order, OrderItem
+from .banners import bump_banners_version
+from .capabilities import get_capability_index
+from .models import Banner, Product, Order, OrderIntake, OrderItem
 from .models import ProductCategory
 from .models import Restaurant
 from .models import RestaurantMenuItem
-from .order_tools import filter_restaurants_by_products
+from .restaurant_index import get_restaurant_index
 
 
 class RestaurantMenuItemInline(admin.TabularInline):
@@ -116,6 +120,16 @@ class OrderItemInline(admin.TabularInline):
     model = OrderItem
     extra = 0
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('order', 'product')
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        """Evaluate product choices once, not for every item form."""
+        formfield = super().formfield_for_foreignkey(db_field, request, **kwargs)
+        if db_field.name == 'product':
+            formfield.choices = list(formfield.choices)
+        return formfield
+
 
 @admin.register(Order)
 class OrderAdmin(admin.ModelAdmin):
@@ -130,34 +144,40 @@ class OrderAdmin(admin.ModelAdmin):
         "payment_type",
         'restaurant',
         "comment",
+        "total",
         "registered_at",
         "called_at",
         "delivered_at",
     )
 
-    readonly_fields = ("registered_at",)
+    readonly_fields = ("total", "registered_at",)
 
     def formfield_for_foreignkey(self, db_field, request, **kwargs):
-        """Filter restaurants where food can be cooked."""
+        """Filter restaurants where food can be cooked, nearest ones go first."""
         if db_field.name == "restaurant":
             obj_id = request.resolver_match.kwargs.get('object_id', None)
             if obj_id is None:
                 return super().formfield_for_foreignkey(db_field, request, **kwargs)
 
-            order_qs = (Order.objects
-                        .filter(pk=obj_id)
-                        .prefetch_related('items')
-                        )
-            order_items = order_qs.get_orders_items()
-            menu_items = RestaurantMenuItem.objects.get_matched_with_order_items(order_items)
-            restaurants = get_restaurants_with_available_products(menu_items)
-
-            order = order_qs.first()
-            order.restaurants = filter_restaurants_by_products(order, restaurants)
-            restaurant_names = [restaurant[0] for restaurant in order.restaurants]
-            restaurants = Restaurant.objects.filter(name__in=restaurant_names).values_list('id')
-
-            kwargs["queryset"] = Restaurant.objects.filter(id__in=restaurants)
+            order = Order.objects.get(pk=obj_id)
+            product_ids = order.items.values_list('product_id', flat=True)
+            restaurant_ids = set(get_capability_index().get_restaurants(product_ids))
+            order_coords = Address.objects.get_addresses_with_coord({order.address}).get(order.address)
+            if order_coords:
+                nearest_restaurants = get_restaurant_index().nearest(*order_coords, restaurant_ids=restaurant_ids)
+                nearest_ids = [restaurant_id for restaurant_id, _, _ in nearest_restaurants]
+                restaurant_ids -= set(nearest_ids)
+            else:
+                nearest_ids = []
+
+            kwargs["queryset"] = (
+                Restaurant.objects
+                .filter(id__in=[*nearest_ids, *restaurant_ids])
+                .order_by(Case(
+                    *[When(id=restaurant_id, then=position) for position, restaurant_id in enumerate(nearest_ids)],
+                    default=len(nearest_ids),
+                ), 'name')
+            )
         return super().formfield_for_foreignkey(db_field, request, **kwargs)
 
     def save_model(self, request, obj, form, change):
@@ -165,9 +185,60 @@ class OrderAdmin(admin.ModelAdmin):
             obj.status = '3'
         super().save_model(request, obj, form, change)
 
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        Order.objects.filter(pk=form.instance.pk).update_totals()
+
     def response_post_save_change(self, request, obj):
         response = super().response_post_save_change(request, obj)
         next_url = request.GET.get('next', '')
         if url_has_allowed_host_and_scheme(next_url, settings.ALLOWED_HOSTS):
             return HttpResponseRedirect(next_url)
         return response
+
+
+@admin.register(Banner)
+class BannerAdmin(admin.ModelAdmin):
+    list_display = [
+        'title',
+        'order',
+        'active_from',
+        'active_until',
+    ]
+    list_editable = [
+        'order',
+    ]
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        transaction.on_commit(bump_banners_version)
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        transaction.on_commit(bump_banners_version)
+
+    def delete_queryset(self, request, queryset):
+        super().delete_queryset(request, queryset)
+        transaction.on_commit(bump_banners_version)
+
+
+@admin.register(OrderIntake)
+class OrderIntakeAdmin(admin.ModelAdmin):
+    list_display = [
+        'token',
+        'status',
+        'order',
+        'created_at',
+        'processed_at',
+    ]
+    list_filter = [
+        'status',
+    ]
+    readonly_fields = [
+        'token',
+        'created_at',
+        'processed_at',
+    ]
+    raw_id_fields = [
+        'order',
+    ]
@@ -0,0 +1,64 @@
+import gzip
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from .cache_versions import bump_version, get_version
+from .catalog import encode_json
+from .models import Banner
+
+
+BANNERS_VERSION_KEY = 'banners:version'
+BANNERS_PAYLOAD_KEY = 'banners:payload:{version}'
+
+
+def bump_banners_version() -> None:
+    """Invalidate cached banners payload in all processes."""
+    bump_version(BANNERS_VERSION_KEY)
+
+
+def get_next_switch(banners, moment):
+    """Return the nearest moment when a set of active banners changes."""
+    switches = [
+        switch
+        for banner in banners
+        for switch in (banner.active_from, banner.active_until)
+        if switch and switch > moment
+    ]
+    return min(switches, default=None)
+
+
+def build_banners_payload() -> dict:
+    """Encode active banners once to plain and gzipped bytes.
+    ETags of encodings differ, as bodies do."""
+    now = timezone.now()
+    banners = list(Banner.objects.all())
+    body = encode_json([
+        {
+            'title': banner.title,
+            'src': banner.image.url,
+            'text': banner.text,
+        }
+        for banner in banners
+        if banner.is_active(now)
+    ])
+    digest = hashlib.md5(body).hexdigest()
+    return {
+        'etag': f'"{digest}"',
+        'gzipped_etag': f'"{digest}-gzip"',
+        'body': body,
+        'gzipped_body': gzip.compress(body),
+        'expires_at': get_next_switch(banners, now),
+    }
+
+
+def get_banners_payload() -> dict:
+    """Return payload of current banners version, it is rebuilt when a scheduled banner is switched."""
+    key = BANNERS_PAYLOAD_KEY.format(version=get_version(BANNERS_VERSION_KEY))
+    payload = cache.get(key)
+    if payload is None or (payload['expires_at'] and payload['expires_at'] <= timezone.now()):
+        payload = build_banners_payload()
+        cache.set(key, payload, timeout=settings.BANNERS_CACHE_TIMEOUT)
+    return payload
@@ -0,0 +1,19 @@
+from uuid import uuid4
+
+from django.core.cache import cache
+
+
+def get_version(key: str) -> str:
+    """Return version stored in cache, create it if cache is empty."""
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, uuid4().hex, timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(key: str) -> str:
+    """Set new version. Version is a random token, so a version evicted from cache is never reused."""
+    version = uuid4().hex
+    cache.set(key, version, timeout=None)
+    return version
@@ -0,0 +1,182 @@
+import threading
+import time
+from collections import defaultdict
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .cache_versions import bump_version, get_version
+from .models import RestaurantMenuItem
+
+
+# bitmaps of bigger indexes are decoded by NumPy, it has overhead on small ones
+SMALL_INDEX_SIZE = 64
+
+CAPABILITIES_VERSION_KEY = 'capabilities:version'
+CAPABILITIES_KEY = 'capabilities:{version}'
+CAPABILITIES_LOCK_KEY = 'capabilities:lock'
+CAPABILITIES_DIRTY_KEY = 'capabilities:dirty'
+
+
+class CapabilityIndex:
+    """Inverted index of restaurant menus: product id -> bitmap of restaurants which have it.
+    Bitmaps are Python ints, bit number is a position of restaurant in restaurant_ids."""
+
+    def __init__(self, menu_items):
+        """:param menu_items: iterable of (restaurant_id, product_id) of available menu items."""
+        self.restaurant_ids = []
+        self.positions = {}
+        self.bitmaps = defaultdict(int)
+        self._restaurant_ids_array = np.array([], dtype=int)
+        for restaurant_id, product_id in menu_items:
+            self.add(restaurant_id, product_id)
+
+    def copy(self) -> 'CapabilityIndex':
+        """Copy to be changed while the original is read by other threads."""
+        capability_index = CapabilityIndex(())
+        capability_index.restaurant_ids = list(self.restaurant_ids)
+        capability_index.positions = dict(self.positions)
+        capability_index.bitmaps = defaultdict(int, self.bitmaps)
+        return capability_index
+
+    def get_position(self, restaurant_id: int) -> int:
+        position = self.positions.get(restaurant_id)
+        if position is None:
+            position = self.positions[restaurant_id] = len(self.restaurant_ids)
+            self.restaurant_ids.append(restaurant_id)
+        return position
+
+    def add(self, restaurant_id: int, product_id: int) -> None:
+        self.bitmaps[product_id] |= 1 << self.get_position(restaurant_id)
+
+    def set_restaurant_products(self, restaurant_id: int, product_ids) -> None:
+        """Replace available products of restaurant."""
+        position = self.get_position(restaurant_id)
+        mask = ~(1 << position)
+        for product_id in self.bitmaps:
+            self.bitmaps[product_id] &= mask
+        for product_id in product_ids:
+            self.bitmaps[product_id] |= 1 << position
+
+    def get_restaurants(self, product_ids) -> list[int]:
+        """Return ids of restaurants where all products can be cooked."""
+        bitmap = (1 << len(self.restaurant_ids)) - 1
+        for product_id in product_ids:
+            bitmap &= self.bitmaps.get(product_id, 0)
+            if not bitmap:
+                return []
+
+        if len(self.restaurant_ids) <= SMALL_INDEX_SIZE:
+            restaurant_ids = []
+            while bitmap:
+                lowest_bit = bitmap & -bitmap
+                restaurant_ids.append(self.restaurant_ids[lowest_bit.bit_length() - 1])
+                bitmap ^= lowest_bit
+            return restaurant_ids
+
+        bits = np.unpackbits(
+            np.frombuffer(bitmap.to_bytes((len(self.restaurant_ids) + 7) // 8, 'little'), dtype=np.uint8),
+            bitorder='little',
+        )
+        if len(self._restaurant_ids_array) != len(self.restaurant_ids):
+            self._restaurant_ids_array = np.array(self.restaurant_ids)
+        return self._restaurant_ids_array[np.flatnonzero(bits)].tolist()
+
+
+def bump_capabilities_version() -> None:
+    """Make every process rebuild capability index from menus on next request."""
+    bump_version(CAPABILITIES_VERSION_KEY)
+
+
+def build_capability_index() -> CapabilityIndex:
+    return CapabilityIndex(
+        RestaurantMenuItem.objects
+        .filter(availability=True)
+        .values_list('restaurant_id', 'product_id')
+    )
+
+
+_capability_index = (None, None, 0.0)
+
+
+def load_capability_index(version: str) -> CapabilityIndex:
+    """Return capability index of given version from process memory, shared cache or menus.
+    Menu changes of other processes are not seen if cache is not shared,
+    so in-process index is rebuilt from menus every RESTAURANT_INDEX_LOCAL_TIMEOUT seconds.
+    Returned index is shared between threads and must not be changed."""
+    global _capability_index
+    local_version, capability_index, expires_at = _capability_index
+    if local_version == version:
+        if time.monotonic() < expires_at:
+            return capability_index
+        # cache of the process may keep the same outdated index
+        capability_index = None
+    else:
+        capability_index = cache.get(CAPABILITIES_KEY.format(version=version))
+
+    if capability_index is None:
+        capability_index = build_capability_index()
+        cache.set(CAPABILITIES_KEY.format(version=version), capability_index,
+                  timeout=settings.RESTAURANT_INDEX_CACHE_TIMEOUT)
+    _capability_index = (version, capability_index, time.monotonic() + settings.RESTAURANT_INDEX_LOCAL_TIMEOUT)
+    return capability_index
+
+
+def get_capability_index() -> CapabilityIndex:
+    """Return capability index of current version.
+    Index is kept in process memory and in shared cache, menus are queried only when cache is empty."""
+    return load_capability_index(get_version(CAPABILITIES_VERSION_KEY))
+
+
+def update_restaurants_capabilities(restaurant_ids) -> None:
+    """Reload menus of restaurants and store changed copy of index under a new version.
+    If another process is updating index now, the update is left to it: index is marked dirty
+    and dropped, so it is rebuilt from menus on next read. The lock holder does not store its
+    index if version moved while it worked, and drops it if index was marked dirty meanwhile."""
+    if not cache.add(CAPABILITIES_LOCK_KEY, True, timeout=30):
+        cache.set(CAPABILITIES_DIRTY_KEY, True, timeout=None)
+        bump_capabilities_version()
+        return
+    try:
+        base_version = get_version(CAPABILITIES_VERSION_KEY)
+        capability_index = load_capability_index(base_version).copy()
+        menus = defaultdict(set)
+        menu_items = (RestaurantMenuItem.objects
+                      .filter(restaurant_id__in=restaurant_ids, availability=True)
+                      .values_list('restaurant_id', 'product_id'))
+        for restaurant_id, product_id in menu_items:
+            menus[restaurant_id].add(product_id)
+        for restaurant_id in restaurant_ids:
+            capability_index.set_restaurant_products(restaurant_id, menus[restaurant_id])
+
+        if get_version(CAPABILITIES_VERSION_KEY) != base_version:
+            bump_capabilities_version()
+            return
+        version = bump_version(CAPABILITIES_VERSION_KEY)
+        cache.set(CAPABILITIES_KEY.format(version=version), capability_index,
+                  timeout=settings.RESTAURANT_INDEX_CACHE_TIMEOUT)
+        if cache.get(CAPABILITIES_DIRTY_KEY):
+            cache.delete(CAPABILITIES_DIRTY_KEY)
+            bump_capabilities_version()
+    finally:
+        cache.delete(CAPABILITIES_LOCK_KEY)
+
+
+_changed_restaurants = threading.local()
+
+
+def schedule_capabilities_update(restaurant_id: int) -> None:
+    """Update index once after commit, however many menu items of the transaction changed."""
+    if not hasattr(_changed_restaurants, 'ids'):
+        _changed_restaurants.ids = set()
+    _changed_restaurants.ids.add(restaurant_id)
+    transaction.on_commit(flush_capabilities_updates)
+
+
+def flush_capabilities_updates() -> None:
+    restaurant_ids = getattr(_changed_restaurants, 'ids', None)
+    if restaurant_ids:
+        _changed_restaurants.ids = set()
+        update_restaurants_capabilities(restaurant_ids)
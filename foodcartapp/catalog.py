@@ -0,0 +1,143 @@
+import hashlib
+import json
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import FileSystemStorage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.encoding import filepath_to_uri
+
+from .cache_versions import bump_version, get_version
+from .models import Product
+
+
+CATALOG_VERSION_KEY = 'catalog:version'
+CATALOG_PAYLOAD_KEY = 'catalog:payload:{version}:{params}'
+CATALOG_ETAG_KEY = 'catalog:etag:{version}:{params}'
+
+PRODUCT_COLUMNS = (
+    'id',
+    'name',
+    'price',
+    'special_status',
+    'description',
+    'category_id',
+    'category__name',
+    'image',
+)
+
+
+def get_catalog_version() -> str:
+    return get_version(CATALOG_VERSION_KEY)
+
+
+def bump_catalog_version() -> None:
+    """Invalidate all cached catalog payloads."""
+    bump_version(CATALOG_VERSION_KEY)
+
+
+def build_media_urls(names: list[str]) -> list[str]:
+    """Build urls of product images without asking storage for every file."""
+    storage = Product._meta.get_field('image').storage
+    if not isinstance(storage, FileSystemStorage) or not storage.base_url.endswith('/'):
+        return [storage.url(name) for name in names]
+    base_url = storage.base_url
+    return [base_url + filepath_to_uri(name).lstrip('/') for name in names]
+
+
+def dump_products(rows: list[tuple]) -> list[dict]:
+    """Dump products from rows of PRODUCT_COLUMNS without creating models."""
+    image_urls = build_media_urls([row[-1] for row in rows])
+    return [
+        {
+            'id': product_id,
+            'name': name,
+            'price': price,
+            'special_status': special_status,
+            'description': description,
+            'category': {
+                'id': category_id,
+                'name': category_name,
+            } if category_id is not None else None,
+            'image': image_url,
+            'restaurant': {
+                'id': product_id,
+                'name': name,
+            }
+        }
+        for (product_id, name, price, special_status, description, category_id, category_name, _), image_url
+        in zip(rows, image_urls)
+    ]
+
+
+def encode_json(data) -> bytes:
+    return json.dumps(
+        data,
+        cls=DjangoJSONEncoder,
+        ensure_ascii=False,
+        separators=(',', ':'),
+    ).encode('utf-8')
+
+
+def filter_products(products, category=None, special_status=None, price_min=None, price_max=None):
+    if category is not None:
+        products = products.filter(category_id=category)
+    if special_status is not None:
+        products = products.filter(special_status=special_status)
+    if price_min is not None:
+        products = products.filter(price__gte=price_min)
+    if price_max is not None:
+        products = products.filter(price__lte=price_max)
+    return products
+
+
+def build_catalog_payload(cursor=None, limit=None, **filters) -> bytes:
+    """Serialize available products.
+    Without limit returns a list of all products, with limit returns
+    a page of products ordered by id and a cursor of the next page."""
+    products = filter_products(Product.objects.available(), **filters)
+    if limit is None:
+        rows = list(products.values_list(*PRODUCT_COLUMNS))
+        return encode_json(dump_products(rows))
+
+    if cursor is not None:
+        products = products.filter(pk__gt=cursor)
+    rows = list(products.order_by('pk').values_list(*PRODUCT_COLUMNS)[:limit + 1])
+    next_cursor = rows[limit - 1][0] if len(rows) > limit else None
+    return encode_json({
+        'results': dump_products(rows[:limit]),
+        'next_cursor': next_cursor,
+    })
+
+
+def get_catalog_keys(params: dict) -> tuple[str, str]:
+    """Return cache keys of ETag and payload of current catalog version.
+    Params with None values are ignored."""
+    params = urlencode(sorted((name, value) for name, value in params.items() if value is not None))
+    version = get_catalog_version()
+    return (
+        CATALOG_ETAG_KEY.format(version=version, params=params),
+        CATALOG_PAYLOAD_KEY.format(version=version, params=params),
+    )
+
+
+def get_catalog_etag(**params) -> str | None:
+    """Return ETag of cached catalog payload, None if payload is not cached yet."""
+    etag_key, _ = get_catalog_keys(params)
+    return cache.get(etag_key)
+
+
+def get_catalog_payload(**params) -> tuple[str, bytes]:
+    """Return ETag and serialized catalog of current version.
+    ETag is a digest of payload, so it does not depend on process that built it.
+    Params are passed to build_catalog_payload, None values are ignored."""
+    etag_key, payload_key = get_catalog_keys(params)
+    cached = cache.get_many([etag_key, payload_key])
+    if len(cached) == 2:
+        return cached[etag_key], cached[payload_key]
+
+    payload = build_catalog_payload(**{name: value for name, value in params.items() if value is not None})
+    etag = f'"{hashlib.md5(payload).hexdigest()}"'
+    cache.set_many({etag_key: etag, payload_key: payload}, timeout=settings.CATALOG_CACHE_TIMEOUT)
+    return etag, payload
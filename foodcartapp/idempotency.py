@@ -0,0 +1,125 @@
+import hashlib
+import json
+import time
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+
+WAIT_INTERVAL = 0.1
+# response headers replayed with the stored response, e.g. Location of an accepted order intake
+REPLAYED_HEADERS = ('Location',)
+
+
+def get_data_hash(data) -> str:
+    """Hash of parsed request data. Raw body can not be used: DRF reads the stream
+    when it checks CSRF token of a session authenticated request."""
+    if hasattr(data, 'lists'):
+        data = dict(data.lists())
+    return hashlib.sha256(
+        json.dumps(data, cls=DjangoJSONEncoder, sort_keys=True, ensure_ascii=False).encode('utf-8')
+    ).hexdigest()
+
+
+def acquire_key(key: str, path: str, request_hash: str) -> tuple[IdempotencyKey, bool]:
+    """Return stored key and whether this request has to be processed.
+    Expired keys and keys of requests stuck in progress are taken over. If the key
+    is released by its request between insert and select, insert is retried."""
+    while True:
+        now = timezone.now()
+        try:
+            with transaction.atomic():
+                idempotency_key = IdempotencyKey.objects.create(
+                    key=key, path=path, request_hash=request_hash, created_at=now,
+                )
+            return idempotency_key, True
+        except IntegrityError:
+            pass
+        try:
+            idempotency_key = IdempotencyKey.objects.get(key=key, path=path)
+            break
+        except IdempotencyKey.DoesNotExist:
+            continue
+
+    is_expired = idempotency_key.created_at <= now - timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL)
+    is_stuck = (idempotency_key.status_code is None
+                and idempotency_key.created_at <= now - timedelta(seconds=settings.IDEMPOTENCY_LOCK_TIMEOUT))
+    if is_expired or is_stuck:
+        taken_over = (IdempotencyKey.objects
+                      .filter(pk=idempotency_key.pk, created_at=idempotency_key.created_at)
+                      .update(request_hash=request_hash, status_code=None, response_data=None,
+                              response_headers=None, created_at=now))
+        if taken_over:
+            idempotency_key.request_hash, idempotency_key.created_at = request_hash, now
+            idempotency_key.status_code = idempotency_key.response_data = idempotency_key.response_headers = None
+            return idempotency_key, True
+    return idempotency_key, False
+
+
+def wait_for_response(idempotency_key: IdempotencyKey) -> bool:
+    """Wait until the request with the same key is processed by another worker.
+    Raises IdempotencyKey.DoesNotExist if that request failed and released the key."""
+    deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_TIMEOUT
+    while idempotency_key.status_code is None and time.monotonic() < deadline:
+        time.sleep(WAIT_INTERVAL)
+        idempotency_key.refresh_from_db(fields=['status_code', 'response_data', 'response_headers'])
+    return idempotency_key.status_code is not None
+
+
+def idempotent(view):
+    """Replay the first successful response and its REPLAYED_HEADERS to requests with the same
+    Idempotency-Key header.
+    Duplicate requests arriving while the first one is processed wait for its response.
+    Failed requests are not stored, so they can be retried with the same key."""
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        key = request.headers.get('Idempotency-Key')
+        if not key:
+            return view(request, *args, **kwargs)
+
+        request_hash = get_data_hash(request.data)
+        while True:
+            idempotency_key, is_acquired = acquire_key(key[:255], request.path, request_hash)
+            if is_acquired:
+                break
+            if idempotency_key.request_hash != request_hash:
+                return Response({'error': 'Idempotency-Key уже использован с другим запросом.'},
+                                status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+            try:
+                is_processed = wait_for_response(idempotency_key)
+            except IdempotencyKey.DoesNotExist:
+                # the first request failed, this one is processed instead
+                continue
+            if not is_processed:
+                return Response({'error': 'Запрос с этим Idempotency-Key ещё обрабатывается.'},
+                                status=status.HTTP_409_CONFLICT, headers={'Retry-After': '1'})
+            headers = {**(idempotency_key.response_headers or {}), 'Idempotent-Replayed': 'true'}
+            return Response(idempotency_key.response_data, status=idempotency_key.status_code,
+                            headers=headers)
+
+        try:
+            response = view(request, *args, **kwargs)
+        except Exception:
+            idempotency_key.delete()
+            raise
+        if status.is_success(response.status_code):
+            idempotency_key.status_code = response.status_code
+            idempotency_key.response_data = response.data
+            idempotency_key.response_headers = {
+                header: response[header] for header in REPLAYED_HEADERS if response.has_header(header)
+            }
+            idempotency_key.save(update_fields=['status_code', 'response_data', 'response_headers'])
+        else:
+            idempotency_key.delete()
+        return response
+
+    return wrapper
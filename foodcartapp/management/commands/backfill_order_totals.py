@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Max
+
+from foodcartapp.models import Order
+
+
+class Command(BaseCommand):
+    help = 'Recalculate stored order totals from prices of order items'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='orders updated by one UPDATE')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        max_pk = Order.objects.aggregate(max_pk=Max('pk'))['max_pk'] or 0
+        updated = 0
+        for first_pk in range(0, max_pk + 1, batch_size):
+            updated += Order.objects.filter(pk__gte=first_pk, pk__lt=first_pk + batch_size).update_totals()
+        self.stdout.write(f'Updated totals of {updated} orders')
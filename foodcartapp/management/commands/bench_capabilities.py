@@ -0,0 +1,59 @@
+import random
+from collections import defaultdict
+from timeit import default_timer
+
+from django.core.management.base import BaseCommand
+
+from foodcartapp.capabilities import CapabilityIndex
+
+
+def get_restaurants_by_scan(restaurants: dict[int, set], product_ids: set) -> list[int]:
+    """Reference implementation: check basket against menu of every restaurant."""
+    return [restaurant_id
+            for restaurant_id, rest_products in restaurants.items()
+            if product_ids.issubset(rest_products)]
+
+
+class Command(BaseCommand):
+    help = 'Compare restaurant capability matching by set scan and by bitmaps'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--restaurants', nargs='+', type=int, default=[10, 100, 1000])
+        parser.add_argument('--baskets', nargs='+', type=int, default=[1, 3, 10], help='products in basket')
+        parser.add_argument('--orders', type=int, default=1000)
+        parser.add_argument('--products', type=int, default=200)
+        parser.add_argument('--density', type=float, default=0.9, help='share of available menu items')
+
+    def handle(self, *args, **options):
+        random.seed(1)
+        products = range(options['products'])
+        for restaurants_count in options['restaurants']:
+            menu_items = [
+                (restaurant_id, product_id)
+                for restaurant_id in range(restaurants_count)
+                for product_id in products
+                if random.random() < options['density']
+            ]
+            restaurants = defaultdict(set)
+            for restaurant_id, product_id in menu_items:
+                restaurants[restaurant_id].add(product_id)
+            capabilities = CapabilityIndex(menu_items)
+
+            for basket_size in options['baskets']:
+                baskets = [set(random.sample(products, basket_size)) for _ in range(options['orders'])]
+
+                started_at = default_timer()
+                scan_result = [get_restaurants_by_scan(restaurants, basket) for basket in baskets]
+                scan_time = default_timer() - started_at
+
+                started_at = default_timer()
+                bitmap_result = [capabilities.get_restaurants(basket) for basket in baskets]
+                bitmap_time = default_timer() - started_at
+
+                if [sorted(ids) for ids in scan_result] != [sorted(ids) for ids in bitmap_result]:
+                    self.stderr.write(f'{restaurants_count} restaurants, basket {basket_size}: results differ')
+                self.stdout.write(
+                    f'{restaurants_count:>5} restaurants, basket {basket_size:>2}, {options["orders"]} orders: '
+                    f'scan {scan_time * 1000:8.2f} ms, bitmap {bitmap_time * 1000:8.2f} ms, '
+                    f'x{scan_time / bitmap_time:.1f}'
+                )
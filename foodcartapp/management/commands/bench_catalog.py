@@ -0,0 +1,92 @@
+import json
+from timeit import default_timer
+
+from django.core.management.base import BaseCommand
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+from foodcartapp.catalog import build_catalog_payload
+from foodcartapp.models import Product, ProductCategory, Restaurant, RestaurantMenuItem
+
+
+def build_catalog_payload_with_models() -> bytes:
+    """Reference implementation: the loop over Product instances."""
+    products = Product.objects.select_related('category').available()
+
+    dumped_products = []
+    for product in products:
+        dumped_product = {
+            'id': product.id,
+            'name': product.name,
+            'price': product.price,
+            'special_status': product.special_status,
+            'description': product.description,
+            'category': {
+                'id': product.category.id,
+                'name': product.category.name,
+            } if product.category else None,
+            'image': product.image.url,
+            'restaurant': {
+                'id': product.id,
+                'name': product.name,
+            }
+        }
+        dumped_products.append(dumped_product)
+    return json.dumps(dumped_products, cls=DjangoJSONEncoder, ensure_ascii=False, indent=4).encode('utf-8')
+
+
+def seed_products(count: int) -> None:
+    categories = [ProductCategory.objects.create(name=f'Категория {number}') for number in range(10)]
+    restaurant = Restaurant.objects.create(name='Бенчмарк', address='Москва')
+    last_product = Product.objects.order_by('pk').last()
+    Product.objects.bulk_create([
+        Product(
+            name=f'Товар {number}',
+            category=categories[number % len(categories)] if number % 7 else None,
+            price=100 + number % 500,
+            image=f'products/product_{number}.jpg',
+            special_status=not number % 20,
+            description='Описание товара ' * 5,
+        )
+        for number in range(count)
+    ], batch_size=1000)
+    products = Product.objects.filter(pk__gt=last_product.pk if last_product else 0)
+    RestaurantMenuItem.objects.bulk_create(
+        [RestaurantMenuItem(restaurant=restaurant, product=product) for product in products],
+        batch_size=1000,
+    )
+
+
+def measure(func, repeat: int) -> tuple[float, bytes]:
+    best = float('inf')
+    for _ in range(repeat):
+        started_at = default_timer()
+        result = func()
+        best = min(best, default_timer() - started_at)
+    return best, result
+
+
+class Command(BaseCommand):
+    help = 'Compare catalog serialization through models with serialization through values_list'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', nargs='+', type=int, default=[1_000, 10_000, 50_000])
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def handle(self, *args, **options):
+        for size in options['sizes']:
+            with transaction.atomic():
+                seed_products(size)
+
+                models_time, models_payload = measure(build_catalog_payload_with_models, options['repeat'])
+                columns_time, columns_payload = measure(build_catalog_payload, options['repeat'])
+                if json.loads(models_payload) != json.loads(columns_payload):
+                    self.stderr.write(f'{size}: payloads differ')
+
+                self.stdout.write(
+                    f'{size:>7} products: '
+                    f'models {models_time * 1000:8.1f} ms, {len(models_payload) / 1024:8.0f} KiB | '
+                    f'columns {columns_time * 1000:8.1f} ms, {len(columns_payload) / 1024:8.0f} KiB | '
+                    f'x{models_time / columns_time:.1f}'
+                )
+                transaction.set_rollback(True)
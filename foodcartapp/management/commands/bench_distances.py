@@ -0,0 +1,81 @@
+import random
+from operator import itemgetter
+from timeit import default_timer
+from types import SimpleNamespace
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from geopy import distance
+
+from foodcartapp.capabilities import CapabilityIndex
+from foodcartapp.order_tools import add_restaurants_with_distance
+from foodcartapp.restaurant_index import RestaurantIndex
+
+
+def add_restaurants_with_geopy_distance(orders, restaurants: list[tuple], addresses: dict) -> None:
+    """Reference implementation: geodesic distance for every order-restaurant pair."""
+    for order in orders:
+        order_lon, order_lat = addresses[order.address]
+        order.restaurants = sorted(
+            ((rest_name, round(distance.distance((rest_lat, rest_lon), (order_lat, order_lon)).km, 2))
+             for _, rest_name, rest_lon, rest_lat in restaurants),
+            key=itemgetter(1),
+        )
+
+
+def make_orders(count: int, products: list[int]) -> tuple[list[SimpleNamespace], dict]:
+    orders = [
+        SimpleNamespace(address=f'Заказ {number}', product_ids=set(random.sample(products, 3)))
+        for number in range(count)
+    ]
+    addresses = {
+        order.address: (random.uniform(37.35, 37.85), random.uniform(55.55, 55.92))
+        for order in orders
+    }
+    return orders, addresses
+
+
+def make_restaurants(count: int) -> list[tuple[int, str, float, float]]:
+    return [
+        (number, f'Ресторан {number}', random.uniform(37.35, 37.85), random.uniform(55.55, 55.92))
+        for number in range(count)
+    ]
+
+
+class Command(BaseCommand):
+    help = 'Compare geopy distances with vectorized haversine matrix'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=300)
+        parser.add_argument('--restaurants', type=int, default=80)
+
+    def handle(self, *args, **options):
+        random.seed(1)
+        products = list(range(20))
+        orders, addresses = make_orders(options['orders'], products)
+        restaurants = make_restaurants(options['restaurants'])
+        capabilities = CapabilityIndex(
+            (restaurant_id, product_id) for restaurant_id, _, _, _ in restaurants for product_id in products
+        )
+        restaurant_index = RestaurantIndex(restaurants, cell_size=settings.RESTAURANT_INDEX_CELL_SIZE)
+
+        started_at = default_timer()
+        add_restaurants_with_geopy_distance(orders, restaurants, addresses)
+        geopy_time = default_timer() - started_at
+        geopy_restaurants = [order.restaurants for order in orders]
+
+        started_at = default_timer()
+        add_restaurants_with_distance(orders, capabilities, addresses, restaurant_index)
+        numpy_time = default_timer() - started_at
+
+        max_error = max(
+            abs(geopy_distance - numpy_distance) / geopy_distance
+            for geopy_order, numpy_order in zip(geopy_restaurants, (order.restaurants for order in orders))
+            for (_, geopy_distance), (_, numpy_distance) in zip(sorted(geopy_order), sorted(numpy_order))
+            if geopy_distance
+        )
+        self.stdout.write(
+            f'{options["orders"]} orders x {options["restaurants"]} restaurants: '
+            f'geopy {geopy_time * 1000:.1f} ms, numpy {numpy_time * 1000:.1f} ms, '
+            f'x{geopy_time / numpy_time:.1f}, max relative difference {max_error:.2%}'
+        )
@@ -0,0 +1,121 @@
+import json
+import random
+from timeit import default_timer
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from foodcartapp.models import Product
+from foodcartapp.synthetic import generate_data, invalidate_caches
+
+
+def get_percentile(values: list[float], percent: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, round(percent / 100 * (len(values) - 1)))]
+
+
+def measure(request, count: int) -> dict:
+    """Call request count times after a warm-up call, return latency percentiles and query counts."""
+    request()
+    latencies = []
+    queries = []
+    for _ in range(count):
+        with CaptureQueriesContext(connection) as captured:
+            started_at = default_timer()
+            response = request()
+            latencies.append((default_timer() - started_at) * 1000)
+        if response.status_code >= 400:
+            raise RuntimeError(f'{response.status_code}: {response.content[:200]}')
+        queries.append(len(captured))
+    return {
+        'p50_ms': round(get_percentile(latencies, 50), 2),
+        'p90_ms': round(get_percentile(latencies, 90), 2),
+        'p99_ms': round(get_percentile(latencies, 99), 2),
+        'mean_ms': round(sum(latencies) / len(latencies), 2),
+        'queries_min': min(queries),
+        'queries_max': max(queries),
+    }
+
+
+class Command(BaseCommand):
+    help = 'Measure latency and query counts of API and manager pages on synthetic data of several scales'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scales', nargs='+', type=int, default=[100, 1000, 5000],
+                            help='numbers of open orders, other data grows with them')
+        parser.add_argument('--requests', type=int, default=30, help='measured requests per endpoint')
+        parser.add_argument('--availability', type=float, default=0.8)
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--output', default='bench_results.json')
+
+    def bench_scale(self, scale: int, options) -> dict:
+        created = generate_data(
+            restaurants=max(5, scale // 20),
+            products=max(20, scale // 10),
+            categories=10,
+            orders=scale,
+            availability=options['availability'],
+            seed=options['seed'],
+        )
+        invalidate_caches()
+
+        manager = User.objects.create_user(f'bench-manager-{scale}', is_staff=True)
+        manager_client = Client()
+        manager_client.force_login(manager)
+        client = Client()
+
+        rand = random.Random(options['seed'])
+        product_ids = list(Product.objects.available().values_list('id', flat=True))
+
+        def register_order():
+            return client.post('/api/order/', {
+                'firstname': 'Иван',
+                'lastname': 'Иванов',
+                'phonenumber': '+79161234567',
+                'address': 'Москва, Красная площадь, 1',
+                'payment_type': 'cash',
+                'products': [
+                    {'product': product_id, 'quantity': 1}
+                    for product_id in rand.sample(product_ids, min(3, len(product_ids)))
+                ],
+            }, content_type='application/json')
+
+        endpoints = {
+            '/api/products/': lambda: client.get('/api/products/'),
+            '/api/order/': register_order,
+            '/manager/orders/': lambda: manager_client.get('/manager/orders/'),
+            '/manager/products/': lambda: manager_client.get('/manager/products/'),
+        }
+        results = {}
+        for name, request in endpoints.items():
+            results[name] = measure(request, options['requests'])
+            self.stdout.write(
+                f'{scale:>6} orders {name:<20} '
+                f'p50 {results[name]["p50_ms"]:8.2f} ms, p90 {results[name]["p90_ms"]:8.2f} ms, '
+                f'p99 {results[name]["p99_ms"]:8.2f} ms, '
+                f'queries {results[name]["queries_min"]}-{results[name]["queries_max"]}'
+            )
+        return {'scale': scale, 'created': created, 'endpoints': results}
+
+    def handle(self, *args, **options):
+        report = {
+            'started_at': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'requests': options['requests'],
+            'scales': [],
+        }
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            for scale in options['scales']:
+                with transaction.atomic():
+                    report['scales'].append(self.bench_scale(scale, options))
+                    transaction.set_rollback(True)
+                invalidate_caches()
+
+        with open(options['output'], 'w') as output:
+            json.dump(report, output, ensure_ascii=False, indent=2)
+        self.stdout.write(f'Results are written to {options["output"]}')
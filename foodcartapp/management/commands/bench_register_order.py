@@ -0,0 +1,89 @@
+from timeit import default_timer
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework import serializers
+from rest_framework.test import APIRequestFactory
+
+from foodcartapp.models import Product, ProductCategory
+from foodcartapp.serializers import OrderItemSerializer, OrderSerializer
+from foodcartapp.views import register_order
+
+
+class PerItemOrderItemSerializer(OrderItemSerializer):
+    """Reference implementation: product is fetched by a query per order item."""
+    product = serializers.PrimaryKeyRelatedField(queryset=Product.objects.all())
+
+
+class PerItemOrderSerializer(OrderSerializer):
+    products = PerItemOrderItemSerializer(many=True, write_only=True)
+
+    def to_internal_value(self, data):
+        return super(OrderSerializer, self).to_internal_value(data)
+
+
+def seed_products(count: int) -> list[int]:
+    category = ProductCategory.objects.create(name='Бенчмарк')
+    return [
+        Product.objects.create(name=f'Товар {number}', category=category, price=100 + number).pk
+        for number in range(count)
+    ]
+
+
+def make_order(product_ids: list[int]) -> dict:
+    return {
+        'firstname': 'Иван',
+        'lastname': 'Иванов',
+        'phonenumber': '+79161234567',
+        'address': 'Москва, Красная площадь, 1',
+        'payment_type': 'cash',
+        'products': [{'product': product_id, 'quantity': 1} for product_id in product_ids],
+    }
+
+
+def measure(func, repeat: int) -> tuple[float, int]:
+    """Return best time and number of queries of one call."""
+    best = float('inf')
+    for _ in range(repeat):
+        with CaptureQueriesContext(connection) as queries:
+            started_at = default_timer()
+            func()
+            best = min(best, default_timer() - started_at)
+    return best, len(queries)
+
+
+class Command(BaseCommand):
+    help = 'Measure register_order latency and product lookups versus basket size'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', nargs='+', type=int, default=[1, 5, 20, 50, 100])
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        factory = APIRequestFactory()
+        with transaction.atomic():
+            product_ids = seed_products(max(options['sizes']))
+            for size in options['sizes']:
+                order = make_order(product_ids[:size])
+
+                def validate_per_item():
+                    PerItemOrderSerializer(data=order).is_valid(raise_exception=True)
+
+                def validate_batch():
+                    OrderSerializer(data=order).is_valid(raise_exception=True)
+
+                def register():
+                    request = factory.post('/api/order/', order, format='json')
+                    assert register_order(request).status_code == 201
+
+                per_item_time, per_item_queries = measure(validate_per_item, options['repeat'])
+                batch_time, batch_queries = measure(validate_batch, options['repeat'])
+                register_time, register_queries = measure(register, options['repeat'])
+                self.stdout.write(
+                    f'{size:>4} items: '
+                    f'validation per item {per_item_time * 1000:7.2f} ms, {per_item_queries:>3} queries | '
+                    f'batch {batch_time * 1000:7.2f} ms, {batch_queries:>3} queries | '
+                    f'register_order {register_time * 1000:7.2f} ms, {register_queries:>3} queries'
+                )
+            transaction.set_rollback(True)
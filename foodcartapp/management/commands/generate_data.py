@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from foodcartapp.synthetic import generate_data
+
+
+class Command(BaseCommand):
+    help = 'Generate restaurants, products, menus, geocoded addresses and open orders'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--restaurants', type=int, default=50)
+        parser.add_argument('--products', type=int, default=200)
+        parser.add_argument('--categories', type=int, default=10)
+        parser.add_argument('--orders', type=int, default=1000)
+        parser.add_argument('--availability', type=float, default=0.8,
+                            help='share of available menu items, from 0 to 1')
+        parser.add_argument('--max-items', type=int, default=5, help='max number of products in an order')
+        parser.add_argument('--seed', type=int)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            created = generate_data(
+                restaurants=options['restaurants'],
+                products=options['products'],
+                categories=options['categories'],
+                orders=options['orders'],
+                availability=options['availability'],
+                max_items=options['max_items'],
+                seed=options['seed'],
+            )
+        self.stdout.write(', '.join(f'{name}: {count}' for name, count in created.items()))
@@ -0,0 +1,30 @@
+import os
+
+from django.conf import settings
+from django.core.files import File
+from django.core.management.base import BaseCommand
+
+from foodcartapp.banners import bump_banners_version
+from foodcartapp.models import Banner
+
+
+class Command(BaseCommand):
+    help = 'Copy missing banner images from assets directory to media storage'
+
+    def handle(self, *args, **options):
+        loaded = 0
+        for banner in Banner.objects.exclude(image=''):
+            storage = banner.image.storage
+            if storage.exists(banner.image.name):
+                continue
+            asset_path = os.path.join(settings.BASE_DIR, 'assets', os.path.basename(banner.image.name))
+            if not os.path.exists(asset_path):
+                self.stderr.write(f'No image {banner.image.name} for banner {banner}')
+                continue
+            with open(asset_path, 'rb') as asset:
+                banner.image.name = storage.save(banner.image.name, File(asset))
+            banner.save(update_fields=['image'])
+            loaded += 1
+        if loaded:
+            bump_banners_version()
+        self.stdout.write(f'Loaded {loaded} banner images')
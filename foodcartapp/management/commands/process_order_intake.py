@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from foodcartapp.order_intake import process_intakes
+
+
+class Command(BaseCommand):
+    help = 'Create orders accepted for asynchronous creation'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=200)
+        parser.add_argument('--loop', action='store_true', help='process intake forever')
+        parser.add_argument('--interval', type=float, default=1, help='seconds to sleep when intake is empty')
+
+    def handle(self, *args, **options):
+        while True:
+            created, failed = process_intakes(options['batch_size'])
+            if created or failed:
+                self.stdout.write(f'Created {created} orders, failed {failed}')
+
+            if not options['loop']:
+                return
+            if created + failed < options['batch_size']:
+                time.sleep(options['interval'])
@@ -0,0 +1,30 @@
+# Generated by Django 3.2.10 on 2026-10-18 18:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0059_auto_20220607_1415'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Banner',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=50, verbose_name='Заголовок')),
+                ('image', models.ImageField(upload_to='banners', verbose_name='Картинка')),
+                ('text', models.CharField(blank=True, max_length=200, verbose_name='Текст')),
+                ('order', models.PositiveIntegerField(db_index=True, default=0, verbose_name='Порядок')),
+                ('active_from', models.DateTimeField(blank=True, null=True, verbose_name='Показывать с')),
+                ('active_until', models.DateTimeField(blank=True, null=True, verbose_name='Показывать до')),
+            ],
+            options={
+                'verbose_name': 'Баннер',
+                'verbose_name_plural': 'Баннеры',
+                'ordering': ('order', 'id'),
+            },
+        ),
+    ]
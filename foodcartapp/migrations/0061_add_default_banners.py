@@ -0,0 +1,29 @@
+from django.db import migrations
+
+
+DEFAULT_BANNERS = [
+    ('Burger', 'burger.jpg', 'Tasty Burger at your door step'),
+    ('Spices', 'food.jpg', 'All Cuisines'),
+    ('New York', 'tasty.jpg', 'Food is incomplete without a tasty dessert'),
+]
+
+
+def add_default_banners(apps, schema_editor):
+    """Move banners, which were hardcoded in banners_list_api, to DB.
+    Images are copied to media storage by load_banner_images command."""
+    Banner = apps.get_model('foodcartapp', 'Banner')
+    Banner.objects.bulk_create(
+        Banner(title=title, image=f'banners/{filename}', text=text, order=order)
+        for order, (title, filename, text) in enumerate(DEFAULT_BANNERS)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0060_banner'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_default_banners, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 3.2.10 on 2026-10-18 18:40
+
+import django.core.serializers.json
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0064_idempotencykey'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderIntake',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.UUIDField(default=uuid.uuid4, editable=False, unique=True, verbose_name='Предварительный номер')),
+                ('payload', models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder, verbose_name='Данные заказа')),
+                ('status', models.CharField(choices=[('pending', 'Ожидает обработки'), ('created', 'Заказ создан'), ('failed', 'Заказ не создан')], db_index=True, default='pending', max_length=10, verbose_name='Статус')),
+                ('errors', models.JSONField(blank=True, null=True, verbose_name='Ошибки')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Когда принят')),
+                ('processed_at', models.DateTimeField(blank=True, null=True, verbose_name='Когда обработан')),
+                ('order', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='intake', to='foodcartapp.order', verbose_name='Заказ')),
+            ],
+            options={
+                'verbose_name': 'Принятый заказ',
+                'verbose_name_plural': 'Принятые заказы',
+            },
+        ),
+    ]
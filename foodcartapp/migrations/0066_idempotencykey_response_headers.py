@@ -0,0 +1,18 @@
+# Generated by Django 3.2.10 on 2026-10-18 19:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0065_orderintake'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='idempotencykey',
+            name='response_headers',
+            field=models.JSONField(blank=True, null=True, verbose_name='Заголовки ответа'),
+        ),
+    ]
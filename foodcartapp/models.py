@@ -1,11 +1,14 @@
+from uuid import uuid4
+
 from django.db import models
-from django.db.models import Sum, F, OuterRef, Subquery
+from django.db.models import DecimalField, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.core.serializers.json import DjangoJSONEncoder
 from django.core.validators import MinValueValidator
+from django.utils import timezone
 
 from phonenumber_field.modelfields import PhoneNumberField
 
-from address.models import Address
-
 
 class Restaurant(models.Model):
     name = models.CharField(
@@ -98,22 +101,6 @@ class Product(models.Model):
         return self.name
 
 
-class RestaurantMenuItemQuerySet(models.QuerySet):
-    def get_matched_with_order_items(self, order_items: dict):
-        addresses = Address.objects.filter(address=OuterRef('restaurant__address'))
-        return (self
-                .select_related('restaurant', 'product')
-                .filter(availability=True, product_id__in=order_items)
-                .annotate(coord_lon=Subquery(addresses.values('longitude')),
-                          coord_lat=Subquery(addresses.values('latitude')))
-                .values('restaurant__name',
-                        'restaurant__address',
-                        'coord_lon',
-                        'coord_lat',
-                        'product_id', )
-                )
-
-
 class RestaurantMenuItem(models.Model):
     restaurant = models.ForeignKey(
         Restaurant,
@@ -133,8 +120,6 @@ class RestaurantMenuItem(models.Model):
         db_index=True
     )
 
-    objects = RestaurantMenuItemQuerySet.as_manager()
-
     class Meta:
         verbose_name = 'пункт меню ресторана'
         verbose_name_plural = 'пункты меню ресторана'
@@ -146,21 +131,22 @@ class RestaurantMenuItem(models.Model):
         return f"{self.restaurant.name} - {self.product.name}"
 
 
-class OrderQueryset(models.QuerySet):
-    def get_order_price(self):
-        return self.annotate(
-            order_price=Sum(F('items__quantity') * F('items__product__price'))
+class OrderQuerySet(models.QuerySet):
+
+    def update_totals(self) -> int:
+        """Recalculate stored totals from prices snapshotted in order items in one UPDATE.
+        :return: number of updated orders."""
+        total_field = DecimalField(max_digits=10, decimal_places=2)
+        items_total = (OrderItem.objects
+                       .filter(order=OuterRef('pk'))
+                       .values('order')
+                       .annotate(total=Sum(F('quantity') * F('price'), output_field=total_field))
+                       .values('total'))
+        return self.update(
+            total=Coalesce(Subquery(items_total), Value(0), output_field=total_field),
+            updated_at=timezone.now(),
         )
 
-    def get_coordinates(self):
-        addresses = Address.objects.filter(address=OuterRef('address'))
-        return self.annotate(coord_lon=Subquery(addresses.values('longitude')),
-                             coord_lat=Subquery(addresses.values('latitude')))
-
-    def get_orders_items(self):
-        return self.values_list('items__product_id').distinct()
-
-
 
 class Order(models.Model):
     """Модель заказа."""
@@ -171,6 +157,7 @@ class Order(models.Model):
     DELIVERING = '4'
     COMPLETED = '5'
     CANCELLED = '6'
+    OPEN_STATUSES = (NEW, APPROVED, COOKING, DELIVERING)
 
     STATUS_CHOICES = (
         (NEW, 'Необработан'),
@@ -207,6 +194,7 @@ class Order(models.Model):
     registered_at = models.DateTimeField('Когда создан', auto_now_add=True, db_index=True)
     called_at = models.DateTimeField('Когда подтвержден', db_index=True, blank=True, null=True)
     delivered_at = models.DateTimeField('Когда доставлен', db_index=True, blank=True, null=True)
+    updated_at = models.DateTimeField('Когда изменён', auto_now=True, db_index=True)
     restaurant = models.ForeignKey(Restaurant,
                                    on_delete=models.SET_NULL,
                                    null=True,
@@ -214,8 +202,15 @@ class Order(models.Model):
                                    related_name='orders',
                                    verbose_name='Какой ресторан готовит'
                                    )
+    total = models.DecimalField(
+        'Сумма заказа',
+        max_digits=10,
+        decimal_places=2,
+        default=0,
+        validators=[MinValueValidator(0)],
+    )
 
-    objects = OrderQueryset.as_manager()
+    objects = OrderQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'Заказ'
@@ -253,3 +248,84 @@ class OrderItem(models.Model):
 
     def __str__(self):
         return f'{self.product}: {self.order}'
+
+
+class Banner(models.Model):
+    title = models.CharField('Заголовок', max_length=50)
+    image = models.ImageField('Картинка', upload_to='banners')
+    text = models.CharField('Текст', max_length=200, blank=True)
+    order = models.PositiveIntegerField('Порядок', default=0, db_index=True)
+    active_from = models.DateTimeField('Показывать с', blank=True, null=True)
+    active_until = models.DateTimeField('Показывать до', blank=True, null=True)
+
+    class Meta:
+        verbose_name = 'Баннер'
+        verbose_name_plural = 'Баннеры'
+        ordering = ('order', 'id')
+
+    def __str__(self):
+        return self.title
+
+    def is_active(self, moment):
+        if self.active_from and self.active_from > moment:
+            return False
+        return not self.active_until or self.active_until > moment
+
+
+class OrderIntake(models.Model):
+    """Validated order accepted for asynchronous creation by process_order_intake command.
+    It is a queue entry, not an append-only log: the worker holding its row lock
+    sets status, errors, order and processed_at in place."""
+    PENDING = 'pending'
+    CREATED = 'created'
+    FAILED = 'failed'
+
+    STATUS_CHOICES = (
+        (PENDING, 'Ожидает обработки'),
+        (CREATED, 'Заказ создан'),
+        (FAILED, 'Заказ не создан'),
+    )
+
+    token = models.UUIDField('Предварительный номер', default=uuid4, unique=True, editable=False)
+    payload = models.JSONField('Данные заказа', encoder=DjangoJSONEncoder)
+    status = models.CharField('Статус', max_length=10, choices=STATUS_CHOICES, default=PENDING, db_index=True)
+    errors = models.JSONField('Ошибки', null=True, blank=True)
+    order = models.OneToOneField(
+        Order,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='intake',
+        verbose_name='Заказ',
+    )
+    created_at = models.DateTimeField('Когда принят', auto_now_add=True)
+    processed_at = models.DateTimeField('Когда обработан', null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Принятый заказ'
+        verbose_name_plural = 'Принятые заказы'
+
+    def __str__(self):
+        return str(self.token)
+
+
+class IdempotencyKey(models.Model):
+    """Response of a request with Idempotency-Key header, replayed to retries of the request.
+    Request is in progress while status_code is empty."""
+    key = models.CharField('Ключ', max_length=255)
+    path = models.CharField('Адрес запроса', max_length=200)
+    request_hash = models.CharField('Хэш тела запроса', max_length=64)
+    status_code = models.PositiveSmallIntegerField('Код ответа', null=True, blank=True)
+    response_data = models.JSONField('Ответ', encoder=DjangoJSONEncoder, null=True, blank=True)
+    response_headers = models.JSONField('Заголовки ответа', null=True, blank=True)
+    created_at = models.DateTimeField('Когда получен', db_index=True)
+
+    class Meta:
+        verbose_name = 'Ключ идемпотентности'
+        verbose_name_plural = 'Ключи идемпотентности'
+        unique_together = [
+            ['key', 'path']
+        ]
+
+    def __str__(self):
+        return self.key
@@ -0,0 +1,153 @@
+"""Pub/sub of order events. Broker is selected by ORDER_EVENTS_BACKEND setting."""
+import itertools
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+
+class BaseBroker:
+    """Broker interface: publish events, subscribe to events published after subscription."""
+
+    def publish(self, event: dict) -> None:
+        raise NotImplementedError
+
+    def subscribe(self, last_event_id: str = None) -> 'BaseSubscription':
+        raise NotImplementedError
+
+
+class BaseSubscription:
+
+    def listen(self, timeout: float) -> list[dict]:
+        """Wait up to timeout seconds for events, return all received ones."""
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+class InProcessSubscription(BaseSubscription):
+
+    def __init__(self, broker: 'InProcessBroker'):
+        self.broker = broker
+        self.events = queue.SimpleQueue()
+
+    def listen(self, timeout: float) -> list[dict]:
+        try:
+            events = [self.events.get(timeout=timeout)]
+        except queue.Empty:
+            return []
+        while not self.events.empty():
+            events.append(self.events.get())
+        return events
+
+    def close(self) -> None:
+        self.broker.unsubscribe(self)
+
+
+class InProcessBroker(BaseBroker):
+    """Delivers events to subscribers of the same process, so it suits a single node only.
+    Events published while subscriber was disconnected are not replayed."""
+
+    def __init__(self):
+        self.subscriptions = set()
+        self.ids = itertools.count(1)
+        self.lock = threading.Lock()
+
+    def publish(self, event: dict) -> None:
+        with self.lock:
+            event = dict(event, id=next(self.ids))
+            for subscription in self.subscriptions:
+                subscription.events.put(event)
+
+    def subscribe(self, last_event_id: str = None) -> InProcessSubscription:
+        subscription = InProcessSubscription(self)
+        with self.lock:
+            self.subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: InProcessSubscription) -> None:
+        with self.lock:
+            self.subscriptions.discard(subscription)
+
+
+class CacheSubscription(BaseSubscription):
+
+    def __init__(self, broker: 'CacheBroker', last_id: int):
+        self.broker = broker
+        self.last_id = last_id
+
+    def listen(self, timeout: float) -> list[dict]:
+        deadline = time.monotonic() + timeout
+        while True:
+            last_id = self.broker.get_last_id()
+            if last_id > self.last_id:
+                first_id = max(self.last_id + 1, last_id - self.broker.max_events + 1)
+                keys = [self.broker.get_event_key(event_id) for event_id in range(first_id, last_id + 1)]
+                events = cache.get_many(keys)
+                self.last_id = last_id
+                return [events[key] for key in keys if key in events]
+            if time.monotonic() >= deadline:
+                return []
+            time.sleep(min(self.broker.poll_interval, max(deadline - time.monotonic(), 0)))
+
+
+class CacheBroker(BaseBroker):
+    """Keeps events in the shared cache under sequential ids, so it works across nodes
+    when cache is shared, e.g. Redis. Subscribers poll the cache for new ids, reconnected
+    subscriber gets events published after Last-Event-ID if they are not expired."""
+
+    LAST_ID_KEY = 'order_events:last_id'
+    EVENT_KEY = 'order_events:{event_id}'
+
+    def __init__(self):
+        self.ttl = settings.ORDER_EVENTS_TTL
+        self.poll_interval = settings.ORDER_EVENTS_POLL_INTERVAL
+        self.max_events = settings.ORDER_EVENTS_MAX_REPLAY
+
+    def get_event_key(self, event_id: int) -> str:
+        return self.EVENT_KEY.format(event_id=event_id)
+
+    def get_last_id(self) -> int:
+        return cache.get(self.LAST_ID_KEY) or 0
+
+    def publish(self, event: dict) -> None:
+        cache.add(self.LAST_ID_KEY, 0, timeout=None)
+        event_id = cache.incr(self.LAST_ID_KEY)
+        cache.set(self.get_event_key(event_id), dict(event, id=event_id), timeout=self.ttl)
+
+    def subscribe(self, last_event_id: str = None) -> CacheSubscription:
+        last_id = self.get_last_id()
+        if last_event_id is not None and last_event_id.isdigit():
+            last_id = min(int(last_event_id), last_id)
+        return CacheSubscription(self, last_id)
+
+
+_broker = None
+
+
+def get_broker() -> BaseBroker:
+    global _broker
+    if _broker is None:
+        _broker = import_string(settings.ORDER_EVENTS_BACKEND)()
+    return _broker
+
+
+@receiver(setting_changed)
+def reset_broker(setting, **kwargs):
+    global _broker
+    if setting.startswith('ORDER_EVENTS_'):
+        _broker = None
+
+
+def publish_order_event(order_id: int, status: str, created: bool) -> None:
+    get_broker().publish({
+        'order_id': order_id,
+        'status': status,
+        'created': created,
+    })
@@ -0,0 +1,144 @@
+from django.db import DatabaseError, connection, transaction
+from django.utils import timezone
+
+from address.models import Address
+
+from .models import Order, OrderIntake, OrderItem, Product
+from .order_events import publish_order_event
+
+
+def collect_product_ids(records) -> set[int]:
+    """Collect product ids from raw, not yet validated orders, skipping malformed ones."""
+    product_ids = set()
+    for record in records:
+        if not isinstance(record, dict) or not isinstance(record.get('products'), list):
+            continue
+        for item in record['products']:
+            try:
+                product_ids.add(int(item['product']))
+            except (TypeError, KeyError, ValueError):
+                continue
+    return product_ids
+
+
+def load_products(records) -> dict[int, Product]:
+    """Fetch products of all raw orders by one query."""
+    return Product.objects.in_bulk(collect_product_ids(records))
+
+
+def create_orders(validated_orders: list[dict]) -> list[Order]:
+    """Create orders validated by OrderSerializer with their items.
+    Orders are inserted by one query if database returns primary keys of inserted rows,
+    otherwise one by one, all items are inserted by one query. Item prices are snapshotted
+    from products. Sets order.created_items."""
+    orders = []
+    for validated_data in validated_orders:
+        items = [
+            dict(item, price=item['product'].price)
+            for item in validated_data['products']
+        ]
+        order = Order(
+            **{key: value for key, value in validated_data.items() if key != 'products'},
+            total=sum(item['price'] * item['quantity'] for item in items),
+        )
+        order.created_items = [OrderItem(**item) for item in items]
+        orders.append(order)
+
+    if connection.features.can_return_rows_from_bulk_insert:
+        Order.objects.bulk_create(orders)
+        transaction.on_commit(lambda: [publish_order_event(order.id, order.status, True) for order in orders])
+    else:
+        for order in orders:
+            order.save()
+
+    for order in orders:
+        for item in order.created_items:
+            item.order = order
+    OrderItem.objects.bulk_create([item for order in orders for item in order.created_items])
+    Address.objects.enqueue({order.address for order in orders})
+    return orders
+
+
+def accept_order(validated_data: dict) -> OrderIntake:
+    """Save validated order for asynchronous creation, products are saved as ids."""
+    payload = {key: value for key, value in validated_data.items() if key != 'products'}
+    payload['phonenumber'] = str(payload['phonenumber'])
+    payload['products'] = [
+        {'product': item['product'].id, 'quantity': item['quantity']}
+        for item in validated_data['products']
+    ]
+    return OrderIntake.objects.create(payload=payload)
+
+
+def create_orders_isolated(validated_orders: list[dict]) -> list[Order | DatabaseError]:
+    """Create orders by one batch. If the batch fails, orders are created one by one,
+    so an order rejected by database does not roll back the others.
+    :return: created order or database error for every validated order."""
+    try:
+        with transaction.atomic():
+            return create_orders(validated_orders)
+    except DatabaseError:
+        pass
+
+    results = []
+    for validated_data in validated_orders:
+        try:
+            with transaction.atomic():
+                results.extend(create_orders([validated_data]))
+        except DatabaseError as error:
+            results.append(error)
+    return results
+
+
+def create_intake_orders(intakes: list[OrderIntake], validated_orders: list[dict]) -> list[Order]:
+    """Create orders of intakes, an intake rejected by database is marked as failed with the error.
+    :return: created orders."""
+    orders = []
+    for intake, result in zip(intakes, create_orders_isolated(validated_orders)):
+        if isinstance(result, DatabaseError):
+            intake.status = OrderIntake.FAILED
+            intake.errors = {'non_field_errors': [str(result)]}
+            continue
+        intake.status = OrderIntake.CREATED
+        intake.order = result
+        orders.append(result)
+    return orders
+
+
+def process_intakes(batch_size: int) -> tuple[int, int]:
+    """Create orders of the oldest pending intakes in one transaction.
+    Intakes locked by another worker are skipped, intakes with products
+    deleted since acceptance or rejected by database are marked as failed.
+    :return: number of created and failed orders."""
+    with transaction.atomic():
+        intakes = list(
+            OrderIntake.objects
+            .select_for_update(skip_locked=True)
+            .filter(status=OrderIntake.PENDING)
+            .order_by('id')[:batch_size]
+        )
+        products = load_products(intake.payload for intake in intakes)
+
+        valid_intakes = []
+        validated_orders = []
+        for intake in intakes:
+            missing_ids = [item['product'] for item in intake.payload['products'] if item['product'] not in products]
+            if missing_ids:
+                intake.status = OrderIntake.FAILED
+                intake.errors = {'products': [f'Продукт {product_id} не найден.' for product_id in missing_ids]}
+                continue
+            validated_orders.append(dict(
+                intake.payload,
+                products=[
+                    {'product': products[item['product']], 'quantity': item['quantity']}
+                    for item in intake.payload['products']
+                ],
+            ))
+            valid_intakes.append(intake)
+
+        orders = create_intake_orders(valid_intakes, validated_orders)
+        now = timezone.now()
+        for intake in intakes:
+            intake.processed_at = now
+        OrderIntake.objects.bulk_update(intakes, ['status', 'errors', 'order', 'processed_at'])
+    return len(orders), len(intakes) - len(orders)
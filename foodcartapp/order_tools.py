@@ -1,32 +1,54 @@
+import math
 from operator import itemgetter
 
-from geopy import distance
-
-
-def filter_restaurants_by_products(order, restaurants: dict[tuple, set]) -> list[tuple]:
-    """Return list of restaurants where products can be cooked."""
-    product_ids = {product.product_id for product in order.items.all()}
-    order_rests = [restaurant
-                   for restaurant, rest_products
-                   in restaurants.items()
-                   if product_ids.issubset(rest_products)]
-    return order_rests
-
-
-def add_distance_to_order(order, restaurants: list[tuple], addresses: list[dict]) -> list[tuple]:
-    order_coords = (order.coord_lon, order.coord_lat)
-    order_coords = order_coords if all(order_coords) else addresses[order.address]
-
-    restaurants_with_distance = []
-    for rest_name, rest_address, rest_coords in restaurants:
-        rest_coords = rest_coords if all(rest_coords) else addresses[rest_address]
-        if rest_coords:
-            restaurants_with_distance.append(
-                (rest_name, round(distance.distance(rest_coords, order_coords).km, 2)))
-    return sorted(restaurants_with_distance, key=itemgetter(1))
-
-
-def filter_by_product_and_add_distance(order, restaurants: dict[tuple, set], addresses: list[dict]) -> list[tuple]:
-    restaurants = filter_restaurants_by_products(order, restaurants)
-    restaurants_with_distance = add_distance_to_order(order, restaurants, addresses)
-    return restaurants_with_distance
+import numpy as np
+from django.conf import settings
+
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def haversine_matrix(points_a, points_b, dtype=np.float64) -> np.ndarray:
+    """Return matrix of great-circle distances in km between every point of points_a and points_b.
+    Points are (lon, lat) in degrees, distance to a point with NaN coordinate is NaN."""
+    points_a = np.radians(np.asarray(points_a, dtype=dtype).reshape(-1, 2))
+    points_b = np.radians(np.asarray(points_b, dtype=dtype).reshape(-1, 2))
+    lon_a, lat_a = points_a[:, 0, np.newaxis], points_a[:, 1, np.newaxis]
+    lon_b, lat_b = points_b[np.newaxis, :, 0], points_b[np.newaxis, :, 1]
+
+    haversine = (np.sin((lat_b - lat_a) / 2) ** 2
+                 + np.cos(lat_a) * np.cos(lat_b) * np.sin((lon_b - lon_a) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(haversine, 0, 1)))
+
+
+def add_restaurants_with_distance(orders, capabilities, addresses: dict,
+                                  restaurant_index, limit: int = None) -> None:
+    """Set order.restaurants to list of (name, distance) of restaurants which can cook order.product_ids,
+    sorted by distance. With limit only nearest restaurants are searched in restaurant_index,
+    without it distances for all orders and all restaurants are calculated in one matrix.
+    order.restaurants is None if order coordinates are unknown,
+    restaurants with unknown coordinates are skipped."""
+    orders = list(orders)
+    orders_coords = [addresses.get(order.address) or (np.nan, np.nan) for order in orders]
+    if limit is None:
+        distances = haversine_matrix(orders_coords, restaurant_index.coords, dtype=settings.ORDER_DISTANCE_DTYPE)
+        distances = np.round(distances, settings.ORDER_DISTANCE_DECIMALS)
+
+    for number, (order, (lon, lat)) in enumerate(zip(orders, orders_coords)):
+        if math.isnan(lon) or math.isnan(lat):
+            order.restaurants = None
+            continue
+        restaurant_ids = set(capabilities.get_restaurants(order.product_ids))
+        if limit is not None:
+            order.restaurants = [
+                (name, distance)
+                for _, name, distance in restaurant_index.nearest(lon, lat, limit, restaurant_ids)
+            ]
+            continue
+        order.restaurants = sorted(
+            ((name, distance)
+             for restaurant_id, name, distance
+             in zip(restaurant_index.ids, restaurant_index.names, distances[number].tolist())
+             if restaurant_id in restaurant_ids),
+            key=itemgetter(1),
+        )
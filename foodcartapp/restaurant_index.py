@@ -0,0 +1,161 @@
+import math
+import time
+from collections import defaultdict
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+
+from address.models import Address
+
+from .cache_versions import bump_version, get_version
+from .models import Restaurant
+from .order_tools import haversine_matrix
+
+
+RESTAURANTS_VERSION_KEY = 'restaurants:version'
+RESTAURANT_INDEX_KEY = 'restaurants:index:{version}'
+KM_PER_DEGREE = 111.19
+
+
+def get_restaurants_version() -> str:
+    return get_version(RESTAURANTS_VERSION_KEY)
+
+
+def bump_restaurants_version() -> None:
+    """Make every process rebuild its restaurant index on next request."""
+    bump_version(RESTAURANTS_VERSION_KEY)
+
+
+class RestaurantIndex:
+    """Grid spatial index of restaurants with known coordinates.
+    Restaurants are put into square cells of cell_size degrees,
+    nearest ones are searched in rings of cells around the point."""
+
+    def __init__(self, restaurants: list[tuple[int, str, float, float]], cell_size: float, version: str = None):
+        self.version = version
+        self.cell_size = cell_size
+        self.ids = [restaurant_id for restaurant_id, _, _, _ in restaurants]
+        self.names = [name for _, name, _, _ in restaurants]
+        self.coords = np.array([(lon, lat) for _, _, lon, lat in restaurants], dtype=np.float64).reshape(-1, 2)
+
+        self.cells = defaultdict(list)
+        for index, (lon, lat) in enumerate(self.coords):
+            self.cells[self.get_cell(lon, lat)].append(index)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def get_cell(self, lon: float, lat: float) -> tuple[int, int]:
+        return math.floor(lon / self.cell_size), math.floor(lat / self.cell_size)
+
+    def iter_ring(self, cell_x: int, cell_y: int, radius: int):
+        if radius == 0:
+            yield cell_x, cell_y
+            return
+        for x in range(cell_x - radius, cell_x + radius + 1):
+            yield x, cell_y - radius
+            yield x, cell_y + radius
+        for y in range(cell_y - radius + 1, cell_y + radius):
+            yield cell_x - radius, y
+            yield cell_x + radius, y
+
+    def get_max_radius(self, cell_x: int, cell_y: int) -> int:
+        return max(
+            (max(abs(x - cell_x), abs(y - cell_y)) for x, y in self.cells),
+            default=-1,
+        )
+
+    def get_distance_bound(self, lat: float, radius: int) -> float:
+        """Return km, closer than which there are no points outside the rings up to radius."""
+        farthest_lat = min(89.0, abs(lat) + (radius + 1) * self.cell_size)
+        return radius * self.cell_size * KM_PER_DEGREE * math.cos(math.radians(farthest_lat))
+
+    def nearest(self, lon: float, lat: float, k: int = None, restaurant_ids: set = None) -> list[tuple[int, str, float]]:
+        """Return up to k nearest restaurants as (id, name, distance in km), sorted by distance.
+        If restaurant_ids is given, only these restaurants are considered. k None means all of them.
+        Search stops as soon as all considered restaurants are found. When a ring has more cells
+        than the grid has occupied ones, the rest are far away and all restaurants are compared instead."""
+        if restaurant_ids is None:
+            candidates_count = len(self.ids)
+        else:
+            candidates_count = len(set(self.ids).intersection(restaurant_ids))
+        if not candidates_count:
+            return []
+
+        cell_x, cell_y = self.get_cell(lon, lat)
+        found_indexes = []
+        found_distances = []
+        for radius in range(self.get_max_radius(cell_x, cell_y) + 1):
+            if 8 * radius > len(self.cells):
+                found_indexes = [
+                    index
+                    for index, restaurant_id in enumerate(self.ids)
+                    if restaurant_ids is None or restaurant_id in restaurant_ids
+                ]
+                found_distances = haversine_matrix((lon, lat), self.coords[found_indexes])[0].tolist()
+                break
+            ring_indexes = [
+                index
+                for cell in self.iter_ring(cell_x, cell_y, radius)
+                for index in self.cells.get(cell, ())
+                if restaurant_ids is None or self.ids[index] in restaurant_ids
+            ]
+            if ring_indexes:
+                found_indexes.extend(ring_indexes)
+                found_distances.extend(haversine_matrix((lon, lat), self.coords[ring_indexes])[0].tolist())
+            if len(found_indexes) == candidates_count:
+                break
+            if k and len(found_indexes) >= k:
+                kth_distance = sorted(found_distances)[k - 1]
+                if kth_distance <= self.get_distance_bound(lat, radius):
+                    break
+
+        nearest = sorted(zip(found_distances, found_indexes))[:k]
+        return [
+            (self.ids[index], self.names[index], round(distance, settings.ORDER_DISTANCE_DECIMALS))
+            for distance, index in nearest
+        ]
+
+
+def build_restaurant_index(version: str = None) -> RestaurantIndex:
+    restaurants = list(Restaurant.objects.values_list('id', 'name', 'address'))
+    addresses = Address.objects.get_addresses_with_coord({address for _, _, address in restaurants})
+    return RestaurantIndex(
+        [
+            (restaurant_id, name, *addresses[address])
+            for restaurant_id, name, address in restaurants
+            if addresses.get(address)
+        ],
+        cell_size=settings.RESTAURANT_INDEX_CELL_SIZE,
+        version=version,
+    )
+
+
+_restaurant_index = None
+_restaurant_index_expires_at = 0.0
+
+
+def get_restaurant_index() -> RestaurantIndex:
+    """Return restaurant index of current version.
+    Index is kept in process memory and in shared cache, so it is built once for all processes
+    and rebuilt when restaurants or their coordinates change. Version is bumped by the process
+    which changed them, other processes do not see the bump if cache is not shared, e.g. the
+    geocode_addresses worker, so index is also rebuilt every RESTAURANT_INDEX_LOCAL_TIMEOUT seconds."""
+    global _restaurant_index, _restaurant_index_expires_at
+    version = get_restaurants_version()
+    key = RESTAURANT_INDEX_KEY.format(version=version)
+    if _restaurant_index is not None and _restaurant_index.version == version:
+        if time.monotonic() < _restaurant_index_expires_at:
+            return _restaurant_index
+        # cache of the process may keep the same outdated index
+        restaurant_index = None
+    else:
+        restaurant_index = cache.get(key)
+
+    if restaurant_index is None:
+        restaurant_index = build_restaurant_index(version)
+        cache.set(key, restaurant_index, timeout=settings.RESTAURANT_INDEX_CACHE_TIMEOUT)
+    _restaurant_index = restaurant_index
+    _restaurant_index_expires_at = time.monotonic() + settings.RESTAURANT_INDEX_LOCAL_TIMEOUT
+    return restaurant_index
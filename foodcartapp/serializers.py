@@ -1,9 +1,31 @@
 from rest_framework import serializers
 
-from .models import Order, OrderItem
+from .models import Order, OrderItem, Product
+from .order_intake import load_products
+
+
+class ProductField(serializers.PrimaryKeyRelatedField):
+    """Looks products up in context['products'] if it is given, so products of an order
+    or of a batch of orders are fetched by one query."""
+
+    def to_internal_value(self, data):
+        products = self.context.get('products')
+        if products is None:
+            return super().to_internal_value(data)
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            product = products.get(int(data))
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        if product is None:
+            self.fail('does_not_exist', pk_value=data)
+        return product
 
 
 class OrderItemSerializer(serializers.ModelSerializer):
+    product = ProductField(queryset=Product.objects.all())
+
     class Meta:
         model = OrderItem
         fields = ['product', 'quantity']
@@ -27,3 +49,9 @@ class OrderSerializer(serializers.ModelSerializer):
     order_items = OrderItemSerializer(many=True, read_only=True)
     products = OrderItemSerializer(many=True, write_only=True)
     comment = serializers.CharField(read_only=True)
+
+    def to_internal_value(self, data):
+        """Fetch all products of the order by one query, unless they are given in context."""
+        if 'products' not in self.context:
+            self.context['products'] = load_products([data])
+        return super().to_internal_value(data)
@@ -0,0 +1,61 @@
+from django.db import transaction
+from django.db.models.signals import post_init, post_save, post_delete
+from django.dispatch import receiver
+
+from address.models import Address
+from address.signals import coordinates_updated
+
+from .capabilities import schedule_capabilities_update
+from .catalog import bump_catalog_version
+from .models import Order, Product, ProductCategory, Restaurant, RestaurantMenuItem
+from .order_events import publish_order_event
+from .restaurant_index import bump_restaurants_version
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=ProductCategory)
+@receiver(post_delete, sender=ProductCategory)
+@receiver(post_save, sender=RestaurantMenuItem)
+@receiver(post_delete, sender=RestaurantMenuItem)
+def invalidate_catalog(sender, **kwargs):
+    """Bump catalog version after commit, so nobody caches uncommitted data."""
+    transaction.on_commit(bump_catalog_version)
+
+
+@receiver(post_save, sender=Restaurant)
+def enqueue_restaurant_address(sender, instance, **kwargs):
+    if instance.address:
+        Address.objects.enqueue([instance.address])
+
+
+@receiver(post_save, sender=Restaurant)
+@receiver(post_delete, sender=Restaurant)
+def invalidate_restaurant_index(sender, **kwargs):
+    transaction.on_commit(bump_restaurants_version)
+
+
+@receiver(coordinates_updated)
+def invalidate_restaurant_index_on_geocoding(sender, addresses, **kwargs):
+    if Restaurant.objects.filter(address__in=addresses).exists():
+        transaction.on_commit(bump_restaurants_version)
+
+
+@receiver(post_save, sender=RestaurantMenuItem)
+@receiver(post_delete, sender=RestaurantMenuItem)
+def update_capabilities(sender, instance, **kwargs):
+    schedule_capabilities_update(instance.restaurant_id)
+
+
+@receiver(post_init, sender=Order)
+def remember_order_status(sender, instance, **kwargs):
+    instance.saved_status = instance.__dict__.get('status')
+
+
+@receiver(post_save, sender=Order)
+def publish_order_change(sender, instance, created, **kwargs):
+    """Publish new orders and status transitions after commit, so subscribers can read them."""
+    if created or instance.status != instance.saved_status:
+        order_id, status = instance.id, instance.status
+        transaction.on_commit(lambda: publish_order_event(order_id, status, created))
+    instance.saved_status = instance.status
@@ -0,0 +1,122 @@
+"""Synthetic restaurants, menus and orders for load testing at production scale."""
+import random
+from uuid import uuid4
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from address.fake_geocoder import get_fake_coordinates
+from address.models import Address
+from address.services import geocoder_cache
+
+from .capabilities import bump_capabilities_version
+from .catalog import bump_catalog_version
+from .models import Order, OrderItem, Product, ProductCategory, Restaurant, RestaurantMenuItem
+from .restaurant_index import bump_restaurants_version
+
+
+BATCH_SIZE = 1000
+
+
+def invalidate_caches() -> None:
+    """Drop cached catalog and indexes, bulk inserts do not send signals which do it."""
+    bump_catalog_version()
+    bump_restaurants_version()
+    bump_capabilities_version()
+    geocoder_cache.clear()
+
+
+def create_in_bulk(model, objects: list) -> list:
+    """Insert objects and return them with primary keys, which SQLite does not return on bulk insert."""
+    last = model.objects.order_by('pk').values_list('pk', flat=True).last() or 0
+    model.objects.bulk_create(objects, batch_size=BATCH_SIZE)
+    return list(model.objects.filter(pk__gt=last).order_by('pk'))
+
+
+def create_addresses(addresses: list[str]) -> None:
+    now = timezone.now()
+    bbox = tuple(settings.GEOCODER_FAKE_BBOX)
+    Address.objects.bulk_create(
+        [
+            Address(address=address, longitude=lon, latitude=lat, fetched_at=now)
+            for address in addresses
+            for lon, lat in [get_fake_coordinates(address, bbox)]
+        ],
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def generate_data(restaurants: int, products: int, categories: int, orders: int,
+                  availability: float = 0.8, max_items: int = 5, seed: int = None) -> dict:
+    """Create restaurants, categories, products, menus with given share of available items,
+    geocoded addresses and open orders. Seed repeats prices, menus and baskets, while names and
+    addresses, and so coordinates, get a random suffix of the run, so data can be added repeatedly.
+    :return: number of created objects by model name."""
+    rand = random.Random(seed)
+    run = uuid4().hex[:8]
+
+    created_categories = create_in_bulk(ProductCategory, [
+        ProductCategory(name=f'Категория {run}-{number}') for number in range(categories)
+    ])
+    created_products = create_in_bulk(Product, [
+        Product(
+            name=f'Товар {run}-{number}',
+            category=rand.choice(created_categories) if created_categories else None,
+            price=rand.randrange(100, 1000),
+            image=f'products/product_{number}.jpg',
+            special_status=rand.random() < 0.05,
+            description='Описание товара',
+        )
+        for number in range(products)
+    ])
+
+    restaurant_addresses = [f'Москва, ресторан {run}-{number}' for number in range(restaurants)]
+    create_addresses(restaurant_addresses)
+    created_restaurants = create_in_bulk(Restaurant, [
+        Restaurant(name=f'Ресторан {run}-{number}', address=address, contact_phone='+79000000000')
+        for number, address in enumerate(restaurant_addresses)
+    ])
+    menu_items = [
+        RestaurantMenuItem(restaurant=restaurant, product=product, availability=rand.random() < availability)
+        for restaurant in created_restaurants
+        for product in created_products
+    ]
+    RestaurantMenuItem.objects.bulk_create(menu_items, batch_size=BATCH_SIZE)
+
+    order_addresses = [f'Москва, заказ {run}-{number}' for number in range(orders)]
+    create_addresses(order_addresses)
+    baskets = [
+        rand.sample(created_products, rand.randint(1, min(max_items, len(created_products))))
+        for _ in order_addresses
+    ]
+    created_orders = create_in_bulk(Order, [
+        Order(
+            address=address,
+            firstname='Иван',
+            lastname=f'Покупатель {number}',
+            phonenumber='+79161234567',
+            payment_type=rand.choice(Order.PAYMENT_CHOICES)[0],
+            status=rand.choice(Order.OPEN_STATUSES),
+            total=sum(product.price for product in basket),
+        )
+        for number, (address, basket) in enumerate(zip(order_addresses, baskets))
+    ])
+    order_items = [
+        OrderItem(order=order, product=product, price=product.price, quantity=1)
+        for order, basket in zip(created_orders, baskets)
+        for product in basket
+    ]
+    OrderItem.objects.bulk_create(order_items, batch_size=BATCH_SIZE)
+
+    transaction.on_commit(invalidate_caches)
+    return {
+        'categories': len(created_categories),
+        'products': len(created_products),
+        'restaurants': len(created_restaurants),
+        'menu_items': len(menu_items),
+        'addresses': len(restaurant_addresses) + len(order_addresses),
+        'orders': len(created_orders),
+        'order_items': len(order_items),
+    }
@@ -0,0 +1,517 @@
+import gzip
+import json
+import random
+import time
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError
+from django.contrib.auth.models import User
+from django.middleware.csrf import _get_new_csrf_token
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from address.models import Address
+
+from . import capabilities, restaurant_index
+from .capabilities import (
+    CAPABILITIES_LOCK_KEY, get_capability_index, update_restaurants_capabilities,
+)
+from .banners import bump_banners_version
+from .catalog import bump_catalog_version
+from .models import Banner, IdempotencyKey, Order, OrderIntake, OrderItem, Product, ProductCategory, Restaurant, RestaurantMenuItem
+from .idempotency import get_data_hash
+from .order_intake import process_intakes
+from .order_tools import haversine_matrix
+from .restaurant_index import RestaurantIndex, get_restaurant_index
+from .synthetic import generate_data
+
+
+class CapabilitiesUpdateTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        category = ProductCategory.objects.create(name='Бургеры')
+        cls.burger, cls.fries = [
+            Product.objects.create(name=name, category=category, price=100)
+            for name in ['Бургер', 'Картошка']
+        ]
+        now = timezone.now()
+        for number in range(2):
+            address = f'Москва, ресторан {number}'
+            Address.objects.create(address=address, longitude=37.6, latitude=55.7, fetched_at=now)
+        cls.first, cls.second = [
+            Restaurant.objects.create(name=f'Ресторан {number}', address=f'Москва, ресторан {number}')
+            for number in range(2)
+        ]
+        for restaurant in [cls.first, cls.second]:
+            RestaurantMenuItem.objects.create(restaurant=restaurant, product=cls.burger)
+
+    def setUp(self):
+        cache.clear()
+        capabilities._capability_index = (None, None, 0.0)
+
+    def test_incremental_update(self):
+        shared_index = get_capability_index()
+        self.assertEqual(shared_index.get_restaurants([self.fries.id]), [])
+
+        RestaurantMenuItem.objects.create(restaurant=self.second, product=self.fries)
+        update_restaurants_capabilities([self.second.id])
+
+        self.assertEqual(get_capability_index().get_restaurants([self.fries.id]), [self.second.id])
+        self.assertEqual(shared_index.get_restaurants([self.fries.id]), [])
+
+    def test_update_while_locked(self):
+        get_capability_index()
+        cache.add(CAPABILITIES_LOCK_KEY, True)
+        RestaurantMenuItem.objects.create(restaurant=self.first, product=self.fries)
+        update_restaurants_capabilities([self.first.id])
+        self.assertEqual(get_capability_index().get_restaurants([self.fries.id]), [self.first.id])
+        cache.delete(CAPABILITIES_LOCK_KEY)
+
+        # lock holder started before the locked out update must not store an index without it
+        RestaurantMenuItem.objects.create(restaurant=self.second, product=self.fries)
+        RestaurantMenuItem.objects.filter(restaurant=self.first, product=self.fries).delete()
+        original_load = capabilities.load_capability_index
+
+        def load_and_update_concurrently(version):
+            capability_index = original_load(version)
+            update_restaurants_capabilities([self.first.id])
+            return capability_index
+
+        capabilities.load_capability_index = load_and_update_concurrently
+        try:
+            update_restaurants_capabilities([self.second.id])
+        finally:
+            capabilities.load_capability_index = original_load
+
+        self.assertEqual(get_capability_index().get_restaurants([self.fries.id]), [self.second.id])
+
+
+    def test_menu_changed_by_another_process(self):
+        self.assertEqual(get_capability_index().get_restaurants([self.fries.id]), [])
+
+        # version bumped by another process is not seen without shared cache
+        RestaurantMenuItem.objects.bulk_create([RestaurantMenuItem(restaurant=self.first, product=self.fries)])
+        self.assertEqual(get_capability_index().get_restaurants([self.fries.id]), [])
+        later = time.monotonic() + settings.RESTAURANT_INDEX_LOCAL_TIMEOUT
+        with mock.patch('foodcartapp.capabilities.time.monotonic', return_value=later):
+            self.assertEqual(get_capability_index().get_restaurants([self.fries.id]), [self.first.id])
+
+
+class RestaurantIndexTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        restaurant_index._restaurant_index = None
+
+    def create_restaurant(self, name, coordinates):
+        longitude, latitude = coordinates or (None, None)
+        Address.objects.create(address=name, longitude=longitude, latitude=latitude,
+                               fetched_at=timezone.now() if coordinates else None)
+        return Restaurant.objects.create(name=name, address=name)
+
+    def test_coordinates_geocoded_by_another_process(self):
+        first = self.create_restaurant('Москва, Тверская 1', (37.61, 55.76))
+        second = self.create_restaurant('Москва, Арбат 1', None)
+        self.assertEqual(get_restaurant_index().ids, [first.id])
+
+        # geocode_addresses worker bumps version in its own cache only
+        Address.objects.filter(address=second.address).update(
+            longitude=37.59, latitude=55.75, fetched_at=timezone.now(),
+        )
+        self.assertEqual(get_restaurant_index().ids, [first.id])
+        later = time.monotonic() + settings.RESTAURANT_INDEX_LOCAL_TIMEOUT
+        with mock.patch('foodcartapp.restaurant_index.time.monotonic', return_value=later):
+            self.assertEqual(get_restaurant_index().ids, [first.id, second.id])
+
+
+class RestaurantIndexNearestTest(SimpleTestCase):
+
+    def setUp(self):
+        generator = random.Random(1)
+        self.restaurants = [
+            (number, f'Ресторан {number}', generator.uniform(37.3, 37.9), generator.uniform(55.5, 56.0))
+            for number in range(80)
+        ]
+        self.restaurants.append((80, 'Ресторан в Петербурге', 30.31, 59.94))
+        self.index = RestaurantIndex(self.restaurants, cell_size=0.05)
+
+    def brute_force(self, lon, lat, k, restaurant_ids):
+        restaurants = [restaurant for restaurant in self.restaurants
+                       if restaurant_ids is None or restaurant[0] in restaurant_ids]
+        if not restaurants:
+            return []
+        distances = haversine_matrix((lon, lat), [(lon, lat) for _, _, lon, lat in restaurants])[0]
+        nearest = sorted(zip(distances.tolist(), [restaurant_id for restaurant_id, *_ in restaurants]))[:k]
+        return [restaurant_id for _, restaurant_id in nearest]
+
+    def test_same_as_brute_force(self):
+        generator = random.Random(2)
+        for _ in range(50):
+            lon, lat = generator.uniform(37.2, 38.0), generator.uniform(55.4, 56.1)
+            k = generator.choice([None, 1, 5, 100])
+            restaurant_ids = generator.choice([None, set(generator.sample(range(90), 10)), set()])
+            with self.subTest(lon=lon, lat=lat, k=k, restaurant_ids=restaurant_ids):
+                self.assertEqual(
+                    [restaurant_id for restaurant_id, _, _ in self.index.nearest(lon, lat, k, restaurant_ids)],
+                    self.brute_force(lon, lat, k, restaurant_ids),
+                )
+
+    def test_does_not_scan_rings_to_outliers(self):
+        with mock.patch.object(self.index, 'iter_ring', wraps=self.index.iter_ring) as iter_ring:
+            self.assertEqual(len(self.index.nearest(37.6, 55.75, 5, {0, 1})), 2)
+            self.assertEqual(self.index.nearest(37.6, 55.75, 5, {1000}), [])
+            self.assertEqual([restaurant_id for restaurant_id, _, _ in self.index.nearest(37.6, 55.75, 5, {80})], [80])
+        max_radius = max(call.args[2] for call in iter_ring.call_args_list)
+        self.assertLess(max_radius, self.index.get_max_radius(*self.index.get_cell(37.6, 55.75)))
+
+
+class ProductListApiTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        category = ProductCategory.objects.create(name='Бургеры')
+        product = Product.objects.create(name='Бургер', category=category, price=100)
+        Address.objects.create(address='Москва', longitude=37.6, latitude=55.7, fetched_at=timezone.now())
+        restaurant = Restaurant.objects.create(name='Ресторан', address='Москва')
+        RestaurantMenuItem.objects.create(restaurant=restaurant, product=product)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_etag_is_digest_of_payload(self):
+        response = self.client.get('/api/products/')
+        etag = response['ETag']
+
+        bump_catalog_version()
+        response = self.client.get('/api/products/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+        Product.objects.update(price=200)
+        bump_catalog_version()
+        response = self.client.get('/api/products/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_not_modified_without_payload(self):
+        etag = self.client.get('/api/products/')['ETag']
+
+        with mock.patch('foodcartapp.views.get_catalog_payload') as get_catalog_payload:
+            response = self.client.get('/api/products/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        get_catalog_payload.assert_not_called()
+
+
+class ProductListFiltersTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.burgers, cls.drinks = [ProductCategory.objects.create(name=name) for name in ['Бургеры', 'Напитки']]
+        cls.products = [
+            Product.objects.create(
+                name=f'Продукт {number}',
+                category=cls.burgers if number % 2 else cls.drinks,
+                price=100 * (number + 1),
+                special_status=number % 3 == 0,
+            )
+            for number in range(7)
+        ]
+        Product.objects.create(name='Нет в меню', category=cls.burgers, price=100)
+        Address.objects.create(address='Москва', longitude=37.6, latitude=55.7, fetched_at=timezone.now())
+        restaurant = Restaurant.objects.create(name='Ресторан', address='Москва')
+        RestaurantMenuItem.objects.bulk_create(
+            RestaurantMenuItem(restaurant=restaurant, product=product) for product in cls.products
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def get_ids(self, params):
+        response = self.client.get('/api/products/', params)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        return [product['id'] for product in (data['results'] if 'limit' in params else data)]
+
+    def test_filters(self):
+        cases = [
+            ({}, self.products),
+            ({'category': self.burgers.id}, self.products[1::2]),
+            ({'special_status': 'true'}, self.products[::3]),
+            ({'special_status': 'false'}, [product for product in self.products if not product.special_status]),
+            ({'price_min': 300, 'price_max': 500}, self.products[2:5]),
+            ({'category': self.drinks.id, 'price_min': 300}, self.products[2::2]),
+        ]
+        for params, expected_products in cases:
+            with self.subTest(params=params):
+                self.assertEqual(sorted(self.get_ids(params)), [product.id for product in expected_products])
+
+    def test_cursor_pagination(self):
+        ids = []
+        params = {'limit': 3, 'category': self.burgers.id}
+        while True:
+            data = self.client.get('/api/products/', params).json()
+            ids.extend(product['id'] for product in data['results'])
+            self.assertLessEqual(len(data['results']), 3)
+            if data['next_cursor'] is None:
+                break
+            params['cursor'] = data['next_cursor']
+        self.assertEqual(ids, [product.id for product in self.products[1::2]])
+
+    def test_invalid_params(self):
+        for params in [{'limit': 0}, {'limit': 501}, {'cursor': 5}, {'cursor': 'abc', 'limit': 3},
+                       {'cursor': -1, 'limit': 3}, {'price_min': 'дорого'}]:
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get('/api/products/', params).status_code, 400)
+        self.assertEqual(len(self.get_ids({'limit': 500})), len(self.products))
+
+
+class BannersApiTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        Banner.objects.all().delete()
+        Banner.objects.create(title='Бургер', image='banners/burger.jpg', text='Вкусно')
+
+    def test_encodings(self):
+        plain = self.client.get('/api/banners/', HTTP_ACCEPT_ENCODING='identity')
+        gzipped = self.client.get('/api/banners/', HTTP_ACCEPT_ENCODING='gzip, deflate;q=0.5')
+        refused = self.client.get('/api/banners/', HTTP_ACCEPT_ENCODING='gzip;q=0, *')
+
+        self.assertNotIn('Content-Encoding', plain)
+        self.assertEqual(gzipped['Content-Encoding'], 'gzip')
+        self.assertNotIn('Content-Encoding', refused)
+        self.assertEqual(json.loads(gzip.decompress(gzipped.content)), plain.json())
+        self.assertEqual(plain.json()[0]['title'], 'Бургер')
+        self.assertNotEqual(plain['ETag'], gzipped['ETag'])
+        self.assertEqual(refused['ETag'], plain['ETag'])
+        for response in [plain, gzipped]:
+            self.assertEqual(response['Vary'], 'Accept-Encoding')
+
+    def test_not_modified(self):
+        plain_etag = self.client.get('/api/banners/')['ETag']
+        gzipped_etag = self.client.get('/api/banners/', HTTP_ACCEPT_ENCODING='gzip')['ETag']
+
+        response = self.client.get('/api/banners/', HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=gzipped_etag)
+        self.assertEqual(response.status_code, 304)
+        response = self.client.get('/api/banners/', HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=plain_etag)
+        self.assertEqual(response.status_code, 200)
+
+        Banner.objects.update(title='Картошка')
+        bump_banners_version()
+        response = self.client.get('/api/banners/', HTTP_IF_NONE_MATCH=plain_etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()[0]['title'], 'Картошка')
+
+
+class GenerateDataTest(TestCase):
+
+    def test_same_seed_adds_new_objects(self):
+        for _ in range(2):
+            created = generate_data(restaurants=2, products=3, categories=1, orders=2, seed=1)
+            self.assertEqual(created['restaurants'], 2)
+
+        self.assertEqual(Restaurant.objects.values('name').distinct().count(), 4)
+        self.assertEqual(Address.objects.count(), 8)
+        products = list(Product.objects.order_by('pk'))
+        self.assertEqual(len({product.name for product in products}), 6)
+        self.assertEqual([product.price for product in products[:3]], [product.price for product in products[3:]])
+
+
+class ProcessIntakesTest(TestCase):
+
+    def test_broken_intake_does_not_block_batch(self):
+        category = ProductCategory.objects.create(name='Бургеры')
+        product = Product.objects.create(name='Бургер', category=category, price=100)
+        payload = {
+            'firstname': 'Иван',
+            'lastname': 'Иванов',
+            'phonenumber': '+79000000000',
+            'address': 'Москва',
+            'payment_type': 'cash',
+            'products': [{'product': product.id, 'quantity': 2}],
+        }
+        first, broken, last = [
+            OrderIntake.objects.create(payload=payload),
+            OrderIntake.objects.create(payload=dict(payload, firstname=None)),
+            OrderIntake.objects.create(payload=payload),
+        ]
+
+        self.assertEqual(process_intakes(batch_size=10), (2, 1))
+
+        for intake in [first, broken, last]:
+            intake.refresh_from_db()
+            self.assertIsNotNone(intake.processed_at)
+        self.assertEqual([first.status, last.status], [OrderIntake.CREATED, OrderIntake.CREATED])
+        self.assertEqual(broken.status, OrderIntake.FAILED)
+        self.assertIn('non_field_errors', broken.errors)
+        self.assertIsNone(broken.order)
+        self.assertEqual(Order.objects.count(), 2)
+        self.assertEqual(first.order.items.get().quantity, 2)
+        self.assertEqual(process_intakes(batch_size=10), (0, 0))
+
+
+class IdempotencyTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        category = ProductCategory.objects.create(name='Бургеры')
+        cls.product = Product.objects.create(name='Бургер', category=category, price=100)
+
+    def setUp(self):
+        self.order = {
+            'firstname': 'Иван',
+            'lastname': 'Иванов',
+            'phonenumber': '+79000000000',
+            'address': 'Москва',
+            'payment_type': 'cash',
+            'products': [{'product': self.product.id, 'quantity': 1}],
+        }
+
+    def register_order(self, order, key='key'):
+        return self.client.post('/api/order/', order, content_type='application/json', HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_replay(self):
+        response = self.register_order(self.order)
+        self.assertEqual(response.status_code, 201)
+        self.assertNotIn('Idempotent-Replayed', response)
+
+        replayed = self.register_order(self.order)
+        self.assertEqual(replayed.status_code, 201)
+        self.assertEqual(replayed['Idempotent-Replayed'], 'true')
+        self.assertEqual(replayed.json(), response.json())
+        self.assertEqual(Order.objects.count(), 1)
+
+    @override_settings(ORDER_INTAKE_ASYNC=True)
+    def test_replay_of_accepted_intake_has_location(self):
+        response = self.register_order(self.order)
+        self.assertEqual(response.status_code, 202)
+
+        replayed = self.register_order(self.order)
+        self.assertEqual(replayed.status_code, 202)
+        self.assertEqual(replayed['Idempotent-Replayed'], 'true')
+        self.assertEqual(replayed['Location'], response['Location'])
+        self.assertEqual(OrderIntake.objects.count(), 1)
+
+    def test_different_body(self):
+        self.register_order(self.order)
+        response = self.register_order(dict(self.order, firstname='Пётр'))
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_key_is_released_on_error(self):
+        response = self.register_order(dict(self.order, firstname=''))
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+        response = self.register_order(self.order)
+        self.assertEqual(response.status_code, 201)
+        self.assertNotIn('Idempotent-Replayed', response)
+
+    def test_session_authenticated_request(self):
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(User.objects.create_user('manager', password='password'))
+        csrf_token = _get_new_csrf_token()
+        client.cookies['csrftoken'] = csrf_token
+
+        for _ in range(2):
+            response = client.post('/api/order/', self.order, content_type='application/json',
+                                   HTTP_IDEMPOTENCY_KEY='key', HTTP_X_CSRFTOKEN=csrf_token)
+            self.assertEqual(response.status_code, 201)
+        self.assertEqual(response['Idempotent-Replayed'], 'true')
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_key_is_released_while_waiting(self):
+        IdempotencyKey.objects.create(
+            key='key', path='/api/order/', request_hash=get_data_hash(self.order), created_at=timezone.now(),
+        )
+
+        def release_key(seconds):
+            IdempotencyKey.objects.all().delete()
+
+        with mock.patch('foodcartapp.idempotency.time.sleep', release_key):
+            response = self.register_order(self.order)
+        self.assertEqual(response.status_code, 201)
+        self.assertNotIn('Idempotent-Replayed', response)
+        self.assertEqual(Order.objects.count(), 1)
+
+
+class OrdersBulkTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        category = ProductCategory.objects.create(name='Бургеры')
+        cls.product = Product.objects.create(name='Бургер', category=category, price=100)
+
+    def setUp(self):
+        self.order = {
+            'firstname': 'Иван',
+            'lastname': 'Иванов',
+            'phonenumber': '+79000000000',
+            'address': 'Москва',
+            'payment_type': 'cash',
+            'products': [{'product': self.product.id, 'quantity': 2}],
+        }
+
+    def register_orders(self, records):
+        return self.client.post('/api/orders/bulk/', records, content_type='application/json')
+
+    def test_all_created(self):
+        response = self.register_orders([self.order, dict(self.order, firstname='Пётр')])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['created'], 2)
+        self.assertEqual(
+            [result['id'] for result in response.json()['results']],
+            list(Order.objects.order_by('id').values_list('id', flat=True)),
+        )
+        self.assertEqual(OrderItem.objects.filter(quantity=2, price=100).count(), 2)
+
+    def test_partial_success(self):
+        response = self.register_orders([
+            self.order,
+            dict(self.order, products=[{'product': self.product.id + 1, 'quantity': 1}]),
+            'не заказ',
+            dict(self.order, phonenumber='12'),
+        ])
+        self.assertEqual(response.status_code, 207)
+        data = response.json()
+        self.assertEqual((data['created'], data['failed']), (1, 3))
+
+        created, unknown_product, not_dict, bad_phone = data['results']
+        self.assertEqual(created, {'index': 0, 'id': Order.objects.get().id})
+        self.assertIn('products', unknown_product['errors'])
+        self.assertIn('non_field_errors', not_dict['errors'])
+        self.assertIn('phonenumber', bad_phone['errors'])
+        self.assertEqual([result['index'] for result in data['results']], [0, 1, 2, 3])
+
+    def test_not_a_list(self):
+        for records in [self.order, []]:
+            with self.subTest(records=records):
+                self.assertEqual(self.register_orders(records).status_code, 400)
+        self.assertFalse(Order.objects.exists())
+
+    def test_database_error_fails_only_its_record(self):
+        bulk_create = OrderItem.objects.bulk_create
+
+        def reject_big_quantity(items, *args, **kwargs):
+            if any(item.quantity > 100 for item in items):
+                raise DatabaseError('numeric field overflow')
+            return bulk_create(items, *args, **kwargs)
+
+        broken_order = dict(self.order, products=[{'product': self.product.id, 'quantity': 1000}])
+        with mock.patch.object(OrderItem.objects, 'bulk_create', reject_big_quantity):
+            response = self.register_orders([self.order, broken_order, self.order])
+
+        self.assertEqual(response.status_code, 207)
+        data = response.json()
+        self.assertEqual((data['created'], data['failed']), (2, 1))
+        first, broken, last = data['results']
+        self.assertEqual(broken, {'index': 1, 'errors': {'non_field_errors': ['numeric field overflow']}})
+        self.assertEqual(
+            [first['id'], last['id']],
+            list(Order.objects.order_by('id').values_list('id', flat=True)),
+        )
+        self.assertEqual(OrderItem.objects.count(), 2)
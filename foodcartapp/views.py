@@ -1,87 +1,167 @@
-from django.db import transaction
-from django.http import JsonResponse
-from django.templatetags.static import static
+from django import forms
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from django.http import HttpResponse, HttpResponseNotModified, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.http import parse_etags
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny
 from rest_framework import status
 from rest_framework.response import Response
 
-from .models import Product, Order, OrderItem
+from .banners import get_banners_payload
+from .catalog import get_catalog_etag, get_catalog_payload
+from .idempotency import idempotent
+from .models import OrderIntake
+from .order_intake import accept_order, create_orders, create_orders_isolated, load_products
 from .serializers import OrderSerializer, OrderItemSerializer
 
 
+def accepts_gzip(request) -> bool:
+    """Check Accept-Encoding header, codings with q=0 are refused."""
+    qualities = {}
+    for coding in request.headers.get('Accept-Encoding', '').split(','):
+        name, _, params = coding.partition(';')
+        quality = 1.0
+        for param in params.split(';'):
+            key, _, value = param.strip().partition('=')
+            if key.lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[name.strip().lower()] = quality
+    return qualities.get('gzip', qualities.get('*', 0.0)) > 0
+
+
 def banners_list_api(request):
-    # FIXME move data to db?
-    return JsonResponse([
-        {
-            'title': 'Burger',
-            'src': static('burger.jpg'),
-            'text': 'Tasty Burger at your door step',
-        },
-        {
-            'title': 'Spices',
-            'src': static('food.jpg'),
-            'text': 'All Cuisines',
-        },
-        {
-            'title': 'New York',
-            'src': static('tasty.jpg'),
-            'text': 'Food is incomplete without a tasty dessert',
-        }
-    ], safe=False, json_dumps_params={
-        'ensure_ascii': False,
-        'indent': 4,
-    })
+    payload = get_banners_payload()
+    is_gzipped = accepts_gzip(request)
+    etag = payload['gzipped_etag'] if is_gzipped else payload['etag']
+
+    if etag in parse_etags(request.headers.get('If-None-Match', '')):
+        response = HttpResponseNotModified()
+    elif is_gzipped:
+        response = HttpResponse(payload['gzipped_body'], content_type='application/json')
+        response['Content-Encoding'] = 'gzip'
+    else:
+        response = HttpResponse(payload['body'], content_type='application/json')
+    response['ETag'] = etag
+    response['Cache-Control'] = f'public, max-age={settings.BANNERS_CACHE_MAX_AGE}'
+    response['Vary'] = 'Accept-Encoding'
+    return response
+
+
+class ProductListParams(forms.Form):
+    category = forms.IntegerField(required=False)
+    special_status = forms.NullBooleanField(required=False)
+    price_min = forms.DecimalField(required=False, min_value=0)
+    price_max = forms.DecimalField(required=False, min_value=0)
+    cursor = forms.IntegerField(required=False, min_value=0)
+    limit = forms.IntegerField(required=False, min_value=1, max_value=500)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if cleaned_data.get('cursor') is not None and cleaned_data.get('limit') is None:
+            self.add_error('limit', 'Укажите limit вместе с cursor.')
+        return cleaned_data
 
 
 def product_list_api(request):
-    products = Product.objects.select_related('category').available()
-
-    dumped_products = []
-    for product in products:
-        dumped_product = {
-            'id': product.id,
-            'name': product.name,
-            'price': product.price,
-            'special_status': product.special_status,
-            'description': product.description,
-            'category': {
-                'id': product.category.id,
-                'name': product.category.name,
-            } if product.category else None,
-            'image': product.image.url,
-            'restaurant': {
-                'id': product.id,
-                'name': product.name,
-            }
-        }
-        dumped_products.append(dumped_product)
-    return JsonResponse(dumped_products, safe=False, json_dumps_params={
-        'ensure_ascii': False,
-        'indent': 4,
-    })
+    params = ProductListParams(request.GET)
+    if not params.is_valid():
+        return JsonResponse(params.errors, status=400, json_dumps_params={'ensure_ascii': False})
+
+    client_etags = parse_etags(request.headers.get('If-None-Match', ''))
+
+    def is_not_modified(etag):
+        return etag is not None and (etag in client_etags or '*' in client_etags)
+
+    # cached ETag is enough to answer 304, payload is loaded only when it has to be sent
+    etag = get_catalog_etag(**params.cleaned_data) if client_etags else None
+    if is_not_modified(etag):
+        response = HttpResponseNotModified()
+    else:
+        etag, payload = get_catalog_payload(**params.cleaned_data)
+        if is_not_modified(etag):
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(payload, content_type='application/json')
+    response['ETag'] = etag
+    response['Cache-Control'] = 'no-cache'
+    return response
 
 
 @api_view(['POST'])
 @permission_classes([AllowAny, ])
+@idempotent
 @transaction.atomic
 def register_order(request):
     serializer = OrderSerializer(data=request.data)
     serializer.is_valid(raise_exception=True)
 
-    validated_data = serializer.validated_data
-    order = Order.objects.create(
-        **{key: value for key, value
-           in validated_data.items()
-           if key != 'products'},
-    )
+    if settings.ORDER_INTAKE_ASYNC:
+        intake = accept_order(serializer.validated_data)
+        return Response(
+            {'intake_id': intake.token, 'status': intake.status},
+            status=status.HTTP_202_ACCEPTED,
+            headers={'Location': reverse('foodcartapp:order_intake', args=[intake.token])},
+        )
 
-    serialized_products = serializer.validated_data['products']
-    for product in serialized_products:
-        product['price'] = product['product'].price
-    products = [OrderItem(order=order, **fields) for fields in serialized_products]
-    OrderItem.objects.bulk_create(products)
+    order, = create_orders([serializer.validated_data])
 
     serializer = OrderSerializer(order)
-    serializer.order_items = OrderItemSerializer(products, many=True)
+    serializer.order_items = OrderItemSerializer(order.created_items, many=True)
     return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny, ])
+def order_intake_status(request, token):
+    """Status of an order accepted for asynchronous creation."""
+    intake = get_object_or_404(OrderIntake, token=token)
+    return Response({
+        'intake_id': intake.token,
+        'status': intake.status,
+        'order_id': intake.order_id,
+        'errors': intake.errors,
+    })
+
+
+@api_view(['POST'])
+@permission_classes([AllowAny, ])
+@idempotent
+def register_orders_bulk(request):
+    """Create a batch of orders. Valid orders are created even if others are invalid or rejected
+    by database, result of every order is reported at its index: id of created order or errors."""
+    records = request.data
+    if not isinstance(records, list) or not 1 <= len(records) <= settings.ORDERS_BULK_MAX_SIZE:
+        return Response(
+            {'error': f'Ожидается список от 1 до {settings.ORDERS_BULK_MAX_SIZE} заказов.'},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    products = load_products(records)
+    results = [None] * len(records)
+    valid_orders = []
+    valid_indexes = []
+    for index, record in enumerate(records):
+        serializer = OrderSerializer(data=record, context={'products': products})
+        if serializer.is_valid():
+            valid_orders.append(serializer.validated_data)
+            valid_indexes.append(index)
+        else:
+            results[index] = {'index': index, 'errors': serializer.errors}
+
+    created = 0
+    for index, result in zip(valid_indexes, create_orders_isolated(valid_orders)):
+        if isinstance(result, DatabaseError):
+            results[index] = {'index': index, 'errors': {'non_field_errors': [str(result)]}}
+        else:
+            results[index] = {'index': index, 'id': result.id}
+            created += 1
+
+    response_status = status.HTTP_201_CREATED if created == len(records) else status.HTTP_207_MULTI_STATUS
+    return Response({'created': created, 'failed': len(records) - created, 'results': results},
+                    status=response_status)
@@ -0,0 +1,48 @@
+from django.contrib import admin
+from django.http import FileResponse
+from django.shortcuts import get_object_or_404
+from django.urls import path, reverse
+from django.utils.html import format_html
+
+from .models import RequestProfile
+
+
+@admin.register(RequestProfile)
+class RequestProfileAdmin(admin.ModelAdmin):
+    list_display = [
+        'created_at',
+        'path',
+        'view',
+        'status_code',
+        'duration',
+        'user',
+        'get_download_link',
+    ]
+    list_filter = [
+        'view',
+    ]
+    search_fields = [
+        'path',
+    ]
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def get_urls(self):
+        return [
+            path('<int:profile_id>/download/', self.admin_site.admin_view(self.download_view),
+                 name='monitoring_requestprofile_download'),
+        ] + super().get_urls()
+
+    def download_view(self, request, profile_id):
+        profile = get_object_or_404(RequestProfile, pk=profile_id)
+        filename = f'profile_{profile.pk}.prof'
+        return FileResponse(profile.file.open('rb'), as_attachment=True, filename=filename)
+
+    @admin.display(description='pstats')
+    def get_download_link(self, obj):
+        url = reverse('admin:monitoring_requestprofile_download', args=[obj.pk])
+        return format_html('<a href="{}">Скачать</a>', url)
@@ -0,0 +1,55 @@
+"""Prometheus metrics. With PROMETHEUS_MULTIPROC_DIR environment variable set,
+every worker writes its values to files in that directory and /metrics sums them up.
+prometheus_client guards every value by a mutex. Middleware updates metrics once per request,
+SQL queries are counted without locks by QueryCounter and added to metrics after response."""
+import os
+
+from prometheus_client import CollectorRegistry, Counter, Histogram, REGISTRY, generate_latest
+from prometheus_client import multiprocess
+
+
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds',
+    'Request latency by view',
+    ['view', 'method', 'status'],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+REQUEST_QUERIES = Histogram(
+    'http_request_db_queries',
+    'SQL queries per request by view',
+    ['view'],
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100, 200, 500),
+)
+DB_QUERIES = Counter(
+    'db_queries',
+    'SQL queries by view',
+    ['view'],
+)
+DB_QUERY_SECONDS = Counter(
+    'db_query_seconds',
+    'Time spent in SQL queries by view',
+    ['view'],
+)
+GEOCODER_REQUESTS = Counter(
+    'geocoder_requests',
+    'Requests to geocoder by backend and result',
+    ['backend', 'result'],
+)
+GEOCODER_SECONDS = Counter(
+    'geocoder_request_seconds',
+    'Time spent in geocoder requests by backend',
+    ['backend'],
+)
+GEOCODER_CACHE_LOOKUPS = Counter(
+    'geocoder_cache_lookups',
+    'Addresses looked up for coordinates by result: hit of in-process cache, hit of DB or miss',
+    ['result'],
+)
+
+
+def render_metrics() -> bytes:
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
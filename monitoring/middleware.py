@@ -0,0 +1,55 @@
+import time
+from contextlib import ExitStack
+
+from django.db import connections
+
+from .metrics import DB_QUERIES, DB_QUERY_SECONDS, REQUEST_LATENCY, REQUEST_QUERIES
+
+
+class QueryCounter:
+    """Execute wrapper counting queries of one request, so it needs no locks."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started_at = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += time.perf_counter() - started_at
+
+
+def get_view_label(request) -> str:
+    """Name of the matched URL pattern, so label values do not grow with URL parameters."""
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unresolved'
+    if match.url_name:
+        return match.view_name
+    return match.route
+
+
+class MetricsMiddleware:
+    """Record latency and SQL queries of every request."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        query_counter = QueryCounter()
+        started_at = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(query_counter))
+            response = self.get_response(request)
+        duration = time.perf_counter() - started_at
+
+        view = get_view_label(request)
+        REQUEST_LATENCY.labels(view, request.method, response.status_code).observe(duration)
+        REQUEST_QUERIES.labels(view).observe(query_counter.count)
+        DB_QUERIES.labels(view).inc(query_counter.count)
+        DB_QUERY_SECONDS.labels(view).inc(query_counter.seconds)
+        return response
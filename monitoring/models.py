@@ -0,0 +1,32 @@
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.db import models
+
+
+def get_profiles_storage():
+    """Profiles are kept out of MEDIA_ROOT, which is served to everyone."""
+    return FileSystemStorage(location=settings.PROFILES_ROOT)
+
+
+class RequestProfile(models.Model):
+    path = models.CharField('Адрес запроса', max_length=500)
+    view = models.CharField('Обработчик', max_length=200, blank=True)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        verbose_name='Кто запросил',
+    )
+    status_code = models.PositiveSmallIntegerField('Код ответа')
+    duration = models.FloatField('Длительность, с')
+    file = models.FileField('Файл pstats', storage=get_profiles_storage, upload_to='%Y/%m/%d')
+    created_at = models.DateTimeField('Когда снят', auto_now_add=True, db_index=True)
+
+    class Meta:
+        verbose_name = 'Профиль запроса'
+        verbose_name_plural = 'Профили запросов'
+        ordering = ('-created_at',)
+
+    def __str__(self):
+        return f'{self.path} {self.created_at:%Y-%m-%d %H:%M:%S}'
@@ -0,0 +1,61 @@
+import cProfile
+import marshal
+import pstats
+import time
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+
+from restaurateur.views import is_manager
+
+from .middleware import get_view_label
+from .models import RequestProfile
+
+
+PROFILE_PARAM = 'profile'
+PROFILE_HEADER = 'X-Profile'
+
+
+def is_profiling_requested(request) -> bool:
+    return PROFILE_PARAM in request.GET or PROFILE_HEADER in request.headers
+
+
+def save_profile(request, response, profiler: cProfile.Profile, duration: float) -> RequestProfile:
+    """Save profile in pstats format, which is read by pstats and snakeviz.
+    Only PROFILES_KEEP latest profiles are kept."""
+    stats = pstats.Stats(profiler)
+    profile = RequestProfile(
+        path=request.get_full_path()[:500],
+        view=get_view_label(request),
+        user=request.user,
+        status_code=response.status_code,
+        duration=duration,
+    )
+    profile.file.save(f'{time.strftime("%H%M%S")}.prof', ContentFile(marshal.dumps(stats.stats)), save=False)
+    profile.save()
+
+    for outdated_profile in RequestProfile.objects.order_by('-created_at')[settings.PROFILES_KEEP:]:
+        outdated_profile.file.delete(save=False)
+        outdated_profile.delete()
+    return profile
+
+
+class ProfilingMiddleware:
+    """Profile a request of a manager by cProfile if it has ?profile parameter or X-Profile header.
+    Other requests pass through after two dict lookups."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not is_profiling_requested(request) or not is_manager(request.user):
+            return self.get_response(request)
+
+        profiler = cProfile.Profile()
+        started_at = time.perf_counter()
+        response = profiler.runcall(self.get_response, request)
+        duration = time.perf_counter() - started_at
+
+        profile = save_profile(request, response, profiler, duration)
+        response['X-Profile-Id'] = str(profile.pk)
+        return response
@@ -0,0 +1,18 @@
+from django.dispatch import receiver
+
+from address.signals import geocoder_cache_looked_up, geocoder_called
+
+from .metrics import GEOCODER_CACHE_LOOKUPS, GEOCODER_REQUESTS, GEOCODER_SECONDS
+
+
+@receiver(geocoder_called)
+def count_geocoder_request(sender, result, duration, **kwargs):
+    GEOCODER_REQUESTS.labels(sender.__name__, result).inc()
+    GEOCODER_SECONDS.labels(sender.__name__).inc(duration)
+
+
+@receiver(geocoder_cache_looked_up)
+def count_geocoder_cache_lookups(sender, hits, db_hits, misses, **kwargs):
+    for result, count in [('hit', hits), ('db_hit', db_hits), ('miss', misses)]:
+        if count:
+            GEOCODER_CACHE_LOOKUPS.labels(result).inc(count)
@@ -0,0 +1,50 @@
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from prometheus_client import REGISTRY
+
+
+class MetricsViewTest(TestCase):
+
+    def test_allowed_ips(self):
+        self.assertEqual(self.client.get('/metrics', REMOTE_ADDR='127.0.0.1').status_code, 200)
+        self.assertEqual(self.client.get('/metrics', REMOTE_ADDR='10.0.0.1').status_code, 403)
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_token_is_required_from_any_address(self):
+        self.assertEqual(self.client.get('/metrics', REMOTE_ADDR='127.0.0.1').status_code, 403)
+        response = self.client.get('/metrics', REMOTE_ADDR='127.0.0.1', HTTP_AUTHORIZATION='Bearer wrong')
+        self.assertEqual(response.status_code, 403)
+
+        response = self.client.get('/metrics', REMOTE_ADDR='10.0.0.1', HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'http_request_duration_seconds', response.content)
+
+
+class MetricsMiddlewareTest(TestCase):
+
+    def get_sample_value(self, name, labels):
+        return REGISTRY.get_sample_value(name, labels) or 0
+
+    def test_request_is_recorded_by_route(self):
+        latency_labels = {'view': 'api/products/', 'method': 'GET', 'status': '200'}
+        requests_before = self.get_sample_value('http_request_duration_seconds_count', latency_labels)
+        queries_before = self.get_sample_value('db_queries_total', {'view': 'api/products/'})
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get('/api/products/')
+
+        self.assertEqual(
+            self.get_sample_value('http_request_duration_seconds_count', latency_labels),
+            requests_before + 1,
+        )
+        self.assertEqual(
+            self.get_sample_value('db_queries_total', {'view': 'api/products/'}),
+            queries_before + len(queries.captured_queries),
+        )
+
+    def test_unresolved_url_label(self):
+        labels = {'view': 'unresolved', 'method': 'GET', 'status': '404'}
+        requests_before = self.get_sample_value('http_request_duration_seconds_count', labels)
+        self.client.get('/no-such-page/')
+        self.assertEqual(self.get_sample_value('http_request_duration_seconds_count', labels), requests_before + 1)
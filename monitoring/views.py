@@ -0,0 +1,21 @@
+import secrets
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from prometheus_client import CONTENT_TYPE_LATEST
+
+from .metrics import render_metrics
+
+
+def is_metrics_request_allowed(request) -> bool:
+    """Behind a reverse proxy every request comes from 127.0.0.1, so METRICS_TOKEN replaces the IP check."""
+    if settings.METRICS_TOKEN:
+        authorization = request.META.get('HTTP_AUTHORIZATION', '')
+        return secrets.compare_digest(authorization.encode(), f'Bearer {settings.METRICS_TOKEN}'.encode())
+    return request.META.get('REMOTE_ADDR') in settings.METRICS_ALLOWED_IPS
+
+
+def metrics_view(request):
+    if not is_metrics_request_allowed(request):
+        return HttpResponseForbidden()
+    return HttpResponse(render_metrics(), content_type=CONTENT_TYPE_LATEST)
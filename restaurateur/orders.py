@@ -0,0 +1,110 @@
+import json
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from address.models import Address
+from foodcartapp.capabilities import get_capability_index
+from foodcartapp.models import Order, OrderItem
+from foodcartapp.order_tools import add_restaurants_with_distance
+from foodcartapp.restaurant_index import get_restaurant_index
+
+
+def encode_cursor(moment: datetime, order_id: int) -> str:
+    return f'{moment.isoformat()}_{order_id}'
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """:raise ValueError: if cursor is malformed."""
+    moment, order_id = cursor.rsplit('_', 1)
+    return datetime.fromisoformat(moment), int(order_id)
+
+
+def filter_after_cursor(orders, field: str, cursor: str):
+    """Keep orders which go after cursor in (field, id) order."""
+    moment, order_id = decode_cursor(cursor)
+    return orders.filter(Q(**{f'{field}__gt': moment}) | Q(**{field: moment, 'id__gt': order_id}))
+
+
+def add_order_details(orders: list[Order]) -> None:
+    """Set order.product_ids, order.coordinates_pending and order.restaurants.
+    Items and addresses are fetched by one query each, addresses cached in process are not fetched at all."""
+    items = (OrderItem.objects
+             .filter(order__in=[order.id for order in orders])
+             .values_list('order_id', 'product_id'))
+    product_ids = defaultdict(set)
+    for order_id, product_id in items:
+        product_ids[order_id].add(product_id)
+
+    addresses = Address.objects.get_addresses_with_coord({order.address for order in orders})
+    for order in orders:
+        order.product_ids = product_ids[order.id]
+        order.coordinates_pending = order.address not in addresses
+    add_restaurants_with_distance(orders, get_capability_index(), addresses,
+                                  get_restaurant_index(), limit=settings.ORDER_NEAREST_RESTAURANTS)
+
+
+def load_orders_for_dashboard(orders, page_size: int, cursor: str = None) -> tuple[list[Order], str | None]:
+    """Load a page of orders with their details.
+    Pages are ordered by registration time, cursor points to the last order of the previous page.
+    Number of queries does not depend on number of orders.
+    :return: orders and cursor of the next page."""
+    if cursor is not None:
+        orders = filter_after_cursor(orders, 'registered_at', cursor)
+    orders = list(
+        orders
+        .select_related('restaurant')
+        .order_by('registered_at', 'id')[:page_size + 1]
+    )
+    next_cursor = None
+    if len(orders) > page_size:
+        next_cursor = encode_cursor(orders[page_size - 1].registered_at, orders[page_size - 1].id)
+    orders = orders[:page_size]
+    add_order_details(orders)
+    return orders, next_cursor
+
+
+def get_safe_changes_cursor() -> str:
+    """Cursor of changes feed which lags behind now by MANAGER_ORDERS_CHANGES_WINDOW seconds.
+    updated_at is set before commit, so a transaction committed late has changes older than
+    ones already loaded. They are not missed if cursor does not go ahead of the window."""
+    return encode_cursor(timezone.now() - timedelta(seconds=settings.MANAGER_ORDERS_CHANGES_WINDOW), 0)
+
+
+def load_changed_orders(cursor: str, limit: int) -> tuple[list[Order], str, bool]:
+    """Load orders changed after cursor, in order of changes.
+    Returned cursor does not go ahead of get_safe_changes_cursor() unless there are more changes,
+    so recent changes are loaded again by the next request.
+    :return: orders, cursor of the last loaded change and whether there are more changes."""
+    orders = list(
+        filter_after_cursor(Order.objects.all(), 'updated_at', cursor)
+        .select_related('restaurant')
+        .order_by('updated_at', 'id')[:limit + 1]
+    )
+    has_more = len(orders) > limit
+    orders = orders[:limit]
+    if orders:
+        cursor = encode_cursor(orders[-1].updated_at, orders[-1].id)
+    if not has_more:
+        cursor = min(cursor, get_safe_changes_cursor(), key=decode_cursor)
+    return orders, cursor, has_more
+
+
+def stream_order_events(subscription, heartbeat: float, duration: float):
+    """Yield order events as server-sent events. Comment lines are sent as heartbeat,
+    so dead connections are noticed. Stream ends after duration seconds and client reconnects."""
+    deadline = time.monotonic() + duration
+    try:
+        yield f'retry: {settings.MANAGER_ORDERS_POLL_INTERVAL * 1000}\n\n'
+        while time.monotonic() < deadline:
+            events = subscription.listen(timeout=min(heartbeat, max(deadline - time.monotonic(), 0)))
+            if not events:
+                yield ': heartbeat\n\n'
+            for event in events:
+                yield f'id: {event["id"]}\ndata: {json.dumps(event)}\n\n'
+    finally:
+        subscription.close()
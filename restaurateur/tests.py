@@ -1,3 +1,303 @@
-from django.test import TestCase
+import re
+from collections import Counter
+from datetime import timedelta
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.http import QueryDict
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from address.models import Address
+from address.services import geocoder_cache
+from foodcartapp.catalog import bump_catalog_version
+from foodcartapp.models import Order, OrderItem, Product, ProductCategory, Restaurant, RestaurantMenuItem
+from foodcartapp.synthetic import generate_data, invalidate_caches
+
+
+SMALL_SCALE = {'restaurants': 2, 'products': 5, 'categories': 2, 'orders': 3}
+LARGE_SCALE = {'restaurants': 10, 'products': 30, 'categories': 5, 'orders': 40}
+
+
+def normalize_sql(sql: str) -> str:
+    """Replace literals, so queries differing only in parameters look the same."""
+    sql = re.sub(r"'(?:[^']|'')*'", '?', sql)
+    sql = re.sub(r'\b\d+(?:\.\d+)?\b', '?', sql)
+    return re.sub(r'\(\?(?:, \?)*\)', '(...)', sql)
+
+
+def describe_queries(queries: list[dict]) -> str:
+    """List queries repeated in a request, the usual sign of N+1 problem, then all queries."""
+    counts = Counter(normalize_sql(query['sql']) for query in queries)
+    repeated = [f'  {count} x {sql}' for sql, count in counts.most_common() if count > 1]
+    return '\n'.join([
+        f'{len(queries)} queries.',
+        'Repeated queries:' if repeated else 'No repeated queries.',
+        *repeated,
+        'All queries:',
+        *(f'  {query["sql"]}' for query in queries),
+    ])
+
+
+class QueryCountMixin:
+    """Assertions on number of SQL queries made by a request."""
+
+    def capture_queries(self, request) -> list[dict]:
+        """Call request twice and return queries of the second call, when caches are warm."""
+        request()
+        with CaptureQueriesContext(connection) as queries:
+            response = request()
+        self.assertLess(response.status_code, 400)
+        return queries.captured_queries
+
+    def assertQueryBudget(self, queries: list[dict], budget: int):
+        if len(queries) > budget:
+            self.fail(f'Query budget {budget} is exceeded. {describe_queries(queries)}')
+
+    def assertQueriesDoNotGrow(self, request, add_rows):
+        """Compare number of queries before and after add_rows()."""
+        small_queries = self.capture_queries(request)
+        add_rows()
+        large_queries = self.capture_queries(request)
+        if len(large_queries) > len(small_queries):
+            self.fail(f'Queries grow with rows: {len(small_queries)} before, {describe_queries(large_queries)}')
+
+
+# session, user, orders, order items, addresses, restaurants of the filter form
+ORDERS_PAGE_QUERY_BUDGET = 6
+
+
+@override_settings(MANAGER_ORDERS_PAGE_SIZE=1000)
+class OrdersPageQueriesTest(QueryCountMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = User.objects.create_user('manager', password='password', is_staff=True)
+        category = ProductCategory.objects.create(name='Бургеры')
+        cls.products = [
+            Product.objects.create(name=f'Бургер {number}', category=category, price=100 + number)
+            for number in range(5)
+        ]
+        now = timezone.now()
+        for number in range(3):
+            address = f'Москва, ресторан {number}'
+            Address.objects.create(address=address, longitude=37.6 + number / 100, latitude=55.7, fetched_at=now)
+            restaurant = Restaurant.objects.create(name=f'Ресторан {number}', address=address)
+            RestaurantMenuItem.objects.bulk_create(
+                RestaurantMenuItem(restaurant=restaurant, product=product) for product in cls.products
+            )
+
+    def setUp(self):
+        cache.clear()
+        geocoder_cache.clear()
+        self.client.force_login(self.manager)
+
+    def create_orders(self, count, **fields):
+        now = timezone.now()
+        Address.objects.bulk_create(
+            Address(address=f'Москва, заказ {number}', longitude=37.5, latitude=55.7 + number / 1000, fetched_at=now)
+            for number in range(count)
+        )
+        Order.objects.bulk_create(
+            Order(address=f'Москва, заказ {number}', firstname='Иван', lastname='Иванов',
+                  phonenumber='+79000000000', status='1', payment_type='cash', **fields)
+            for number in range(count)
+        )
+        OrderItem.objects.bulk_create(
+            OrderItem(order=order, product=product, price=product.price, quantity=2)
+            for order in Order.objects.all()
+            for product in self.products[:2]
+        )
+
+    def assert_orders_page_queries(self, orders_count):
+        self.create_orders(orders_count)
+        url = reverse('restaurateur:view_orders')
+        self.client.get(url)
+        geocoder_cache.clear()
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['orders']), orders_count)
+        self.assertQueryBudget(queries.captured_queries, ORDERS_PAGE_QUERY_BUDGET)
+
+    def test_10_orders(self):
+        self.assert_orders_page_queries(10)
+
+    def test_100_orders(self):
+        self.assert_orders_page_queries(100)
+
+    def test_1000_orders(self):
+        self.assert_orders_page_queries(1000)
+
+    @override_settings(MANAGER_ORDERS_PAGE_SIZE=40)
+    def test_pages_and_filters(self):
+        self.create_orders(100)
+        Order.objects.filter(pk__in=Order.objects.order_by('id').values('pk')[:30]).update(payment_type='online')
+        url = reverse('restaurateur:view_orders')
+
+        shown_ids = []
+        params = {'payment_type': 'cash'}
+        while True:
+            response = self.client.get(url, params)
+            shown_ids.extend(order.id for order in response.context['orders'])
+            if not response.context['next_page_params']:
+                break
+            params = QueryDict(response.context['next_page_params'])
+
+        expected_ids = list(Order.objects.filter(payment_type='cash').order_by('registered_at', 'id')
+                            .values_list('id', flat=True))
+        self.assertEqual(shown_ids, expected_ids)
+        self.assertEqual(self.client.get(url, {'cursor': 'broken'}).status_code, 400)
+
+    @override_settings(MANAGER_ORDERS_CHANGES_WINDOW=0)
+    def test_changes_feed(self):
+        self.create_orders(3)
+        first, second, third = Order.objects.order_by('id')
+        response = self.client.get(reverse('restaurateur:view_orders'))
+        cursor = response.context['changes_cursor']
+
+        second.status = Order.COMPLETED
+        second.save()
+        third.comment = 'Позвонить заранее'
+        third.save()
+
+        url = reverse('restaurateur:orders_changes')
+        changes = self.client.get(url, {'cursor': cursor}).json()
+        self.assertEqual([change['id'] for change in changes['orders']], [second.id, third.id])
+        self.assertIsNone(changes['orders'][0]['html'])
+        self.assertIn('Позвонить заранее', changes['orders'][1]['html'])
+        self.assertFalse(changes['has_more'])
+
+        changes = self.client.get(url, {'cursor': changes['cursor']}).json()
+        self.assertEqual(changes['orders'], [])
+
+    def test_changes_feed_redelivers_late_commits(self):
+        self.create_orders(2)
+        Order.objects.update(updated_at=timezone.now() - timedelta(hours=1))
+        first, second = Order.objects.order_by('id')
+        url = reverse('restaurateur:orders_changes')
+        response = self.client.get(reverse('restaurateur:view_orders'))
+
+        first.comment = 'Без лука'
+        first.save()
+        changes = self.client.get(url, {'cursor': response.context['changes_cursor']}).json()
+        self.assertEqual([change['id'] for change in changes['orders']], [first.id])
+
+        # saved before the first change, but committed after it was loaded
+        Order.objects.filter(id=second.id).update(comment='Позвонить', updated_at=first.updated_at - timedelta(seconds=1))
+        changes = self.client.get(url, {'cursor': changes['cursor']}).json()
+        self.assertEqual([change['id'] for change in changes['orders']], [second.id, first.id])
+
+        with self.settings(MANAGER_ORDERS_CHANGES_WINDOW=0):
+            changes = self.client.get(url, {'cursor': changes['cursor']}).json()
+            changes = self.client.get(url, {'cursor': changes['cursor']}).json()
+        self.assertEqual(changes['orders'], [])
+
+    def test_changes_feed_after_admin_items_edit(self):
+        self.create_orders(1)
+        order = Order.objects.get()
+        response = self.client.get(reverse('restaurateur:view_orders'))
+        cursor = response.context['changes_cursor']
+
+        admin = User.objects.create_superuser('admin', password='password')
+        self.client.force_login(admin)
+        items = list(order.items.all())
+        data = {
+            'address': order.address,
+            'firstname': order.firstname,
+            'lastname': order.lastname,
+            'phonenumber': str(order.phonenumber),
+            'status': order.status,
+            'payment_type': order.payment_type,
+            'restaurant': '',
+            'comment': '',
+            'called_at_0': '', 'called_at_1': '',
+            'delivered_at_0': '', 'delivered_at_1': '',
+            'items-TOTAL_FORMS': len(items),
+            'items-INITIAL_FORMS': len(items),
+            'items-MIN_NUM_FORMS': 0,
+            'items-MAX_NUM_FORMS': 1000,
+        }
+        for number, item in enumerate(items):
+            data.update({
+                f'items-{number}-id': item.id,
+                f'items-{number}-order': order.id,
+                f'items-{number}-product': item.product_id,
+                f'items-{number}-price': item.price,
+                f'items-{number}-quantity': 10,
+            })
+        response = self.client.post(reverse('admin:foodcartapp_order_change', args=[order.id]), data)
+        self.assertEqual(response.status_code, 302)
+
+        changes = self.client.get(reverse('restaurateur:orders_changes'), {'cursor': cursor}).json()
+        self.assertEqual([change['id'] for change in changes['orders']], [order.id])
+        order.refresh_from_db()
+        self.assertEqual(order.total, sum(item.price * 10 for item in items))
+
+    @override_settings(ORDER_EVENTS_HEARTBEAT=0.1, ORDER_EVENTS_STREAM_DURATION=0.3)
+    def test_orders_stream(self):
+        self.create_orders(2)
+        first, second = Order.objects.order_by('id')
+        for backend in ['foodcartapp.order_events.InProcessBroker', 'foodcartapp.order_events.CacheBroker']:
+            with self.subTest(backend=backend), self.settings(ORDER_EVENTS_BACKEND=backend):
+                response = self.client.get(reverse('restaurateur:orders_stream'))
+                self.assertEqual(response['Content-Type'], 'text/event-stream')
+
+                with self.captureOnCommitCallbacks(execute=True):
+                    first.comment = 'Без лука'
+                    first.save()
+                    second.status = Order.CANCELLED if second.status == Order.NEW else Order.NEW
+                    second.save()
+
+                stream = b''.join(response.streaming_content).decode()
+                self.assertEqual(stream.count('data: '), 1)
+                self.assertIn(f'"order_id": {second.id}', stream)
+
+
+class HotViewsQueriesTest(QueryCountMixin, TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.manager = User.objects.create_superuser('manager', password='password')
+        self.client.force_login(self.manager)
+        self.seed(SMALL_SCALE, seed=1)
+
+    def seed(self, scale: dict, seed: int):
+        generate_data(**scale, seed=seed)
+        invalidate_caches()
+
+    def add_large_scale(self):
+        self.seed(LARGE_SCALE, seed=2)
+
+    def test_view_orders(self):
+        url = reverse('restaurateur:view_orders')
+        self.assertQueriesDoNotGrow(lambda: self.client.get(url), self.add_large_scale)
+
+    def test_view_products(self):
+        url = reverse('restaurateur:ProductsView')
+        self.assertQueriesDoNotGrow(lambda: self.client.get(url), self.add_large_scale)
+
+    def test_product_list_api(self):
+        def request():
+            bump_catalog_version()
+            return self.client.get('/api/products/')
+
+        self.assertQueriesDoNotGrow(request, self.add_large_scale)
+
+    def test_order_admin_change_form(self):
+        order = Order.objects.first()
+        url = reverse('admin:foodcartapp_order_change', args=[order.id])
+
+        def add_items():
+            self.add_large_scale()
+            OrderItem.objects.bulk_create(
+                OrderItem(order=order, product=product, price=product.price, quantity=1)
+                for product in Product.objects.exclude(order_items__order=order)
+            )
+
+        self.assertQueriesDoNotGrow(lambda: self.client.get(url), add_items)
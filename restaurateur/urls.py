@@ -10,6 +10,8 @@ urlpatterns = [
     path('products/', views.view_products, name="ProductsView"),
     path('restaurants/', views.view_restaurants, name="RestaurantView"),
     path('orders/', views.view_orders, name="view_orders"),
+    path('orders/changes/', views.view_orders_changes, name="orders_changes"),
+    path('orders/stream/', views.view_orders_stream, name="orders_stream"),
 
     path('login/', views.LoginView.as_view(), name="login"),
     path('logout/', views.LogoutView.as_view(), name="logout"),
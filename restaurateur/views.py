@@ -1,17 +1,26 @@
-from collections import defaultdict
-
 from django import forms
+from django.conf import settings
+from django.http import HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
 from django.shortcuts import redirect, render
+from django.template.loader import render_to_string
 from django.views import View
-from django.urls import reverse_lazy
+from django.urls import reverse, reverse_lazy
 from django.contrib.auth.decorators import user_passes_test
 
 from django.contrib.auth import authenticate, login
 from django.contrib.auth import views as auth_views
 
-from address.models import Address
-from foodcartapp.models import Product, Restaurant, Order, RestaurantMenuItem
-from foodcartapp.order_tools import filter_by_product_and_add_distance
+from foodcartapp.models import Order, Product, Restaurant
+from foodcartapp.order_events import get_broker
+
+from .orders import (
+    add_order_details,
+    decode_cursor,
+    get_safe_changes_cursor,
+    load_changed_orders,
+    load_orders_for_dashboard,
+    stream_order_events,
+)
 
 
 class Login(forms.Form):
@@ -31,6 +40,42 @@ class Login(forms.Form):
     )
 
 
+class OrdersFilter(forms.Form):
+    status = forms.ChoiceField(
+        label='Статус', required=False,
+        choices=[('', 'Все необработанные'), *(
+            (value, name) for value, name in Order.STATUS_CHOICES if value in Order.OPEN_STATUSES
+        )],
+    )
+    payment_type = forms.ChoiceField(
+        label='Способ оплаты', required=False,
+        choices=[('', 'Любой'), *Order.PAYMENT_CHOICES],
+    )
+    restaurant = forms.ModelChoiceField(
+        label='Ресторан', required=False, empty_label='Любой',
+        queryset=Restaurant.objects.order_by('name'),
+    )
+    cursor = forms.CharField(required=False, widget=forms.HiddenInput)
+
+    def clean_cursor(self):
+        cursor = self.cleaned_data['cursor'] or None
+        if cursor is not None:
+            try:
+                decode_cursor(cursor)
+            except ValueError:
+                raise forms.ValidationError('Некорректный курсор страницы.')
+        return cursor
+
+    def filter_orders(self, orders):
+        statuses = [self.cleaned_data['status']] if self.cleaned_data['status'] else Order.OPEN_STATUSES
+        orders = orders.filter(status__in=statuses)
+        if self.cleaned_data['payment_type']:
+            orders = orders.filter(payment_type=self.cleaned_data['payment_type'])
+        if self.cleaned_data['restaurant']:
+            orders = orders.filter(restaurant=self.cleaned_data['restaurant'])
+        return orders
+
+
 class LoginView(View):
     def get(self, request, *args, **kwargs):
         form = Login()
@@ -69,7 +114,7 @@ def is_manager(user):
 @user_passes_test(is_manager, login_url='restaurateur:login')
 def view_products(request):
     restaurants = list(Restaurant.objects.order_by('name'))
-    products = list(Product.objects.prefetch_related('menu_items'))
+    products = list(Product.objects.select_related('category').prefetch_related('menu_items'))
 
     default_availability = {restaurant.id: False for restaurant in restaurants}
     products_with_restaurants = []
@@ -97,40 +142,79 @@ def view_restaurants(request):
     })
 
 
-def get_restaurants_with_available_products(menu_items: list) -> defaultdict[tuple, set]:
-    """Get restaurants where all of menu_items can be cooked.
-    :return: tuple(name, address) in a key and set of product_ids in value."""
-    restaurants = defaultdict(set)
-    for menu_item in menu_items:
-        restaurant_name, address, product_id, lon, lat = menu_item.values()
-        restaurants[(restaurant_name, address, (lon, lat))].add(product_id)
-    return restaurants
-
-
 @user_passes_test(is_manager, login_url='restaurateur:login')
 def view_orders(request):
-    statuses = ["1", "2", "3", "4"]
-
-    orders = (Order.objects
-              .prefetch_related('items', 'restaurant')
-              .filter(status__in=statuses)
-              .get_order_price()
-              .get_coordinates()
-              .order_by('status')
-              )
-    order_items = orders.get_orders_items()
-    menu_items = RestaurantMenuItem.objects.get_matched_with_order_items(order_items)
-    restaurants = get_restaurants_with_available_products(menu_items)
-
-    order_and_rest_addresses = {
-        *[order.address for order in orders],
-        *[address for _, address, _ in restaurants]
-    }
-    addresses = Address.objects.get_or_create_addresses_with_coord(order_and_rest_addresses)
-
-    for order in orders:
-        order.restaurants = filter_by_product_and_add_distance(order, restaurants, addresses)
+    orders_filter = OrdersFilter(request.GET)
+    if not orders_filter.is_valid():
+        return HttpResponseBadRequest('Некорректные параметры фильтра')
+
+    changes_cursor = get_safe_changes_cursor()
+    orders, next_cursor = load_orders_for_dashboard(
+        orders_filter.filter_orders(Order.objects.all()),
+        page_size=settings.MANAGER_ORDERS_PAGE_SIZE,
+        cursor=orders_filter.cleaned_data['cursor'],
+    )
+
+    next_page_params = None
+    if next_cursor is not None:
+        next_page_params = request.GET.copy()
+        next_page_params['cursor'] = next_cursor
+        next_page_params = next_page_params.urlencode()
 
     return render(request, template_name='order_items.html', context={
-        "orders": orders
+        "orders": orders,
+        "orders_filter": orders_filter,
+        "next_page_params": next_page_params,
+        "changes_cursor": changes_cursor,
+        "poll_interval": settings.MANAGER_ORDERS_POLL_INTERVAL,
+        "stream_poll_interval": settings.MANAGER_ORDERS_STREAM_POLL_INTERVAL,
     })
+
+
+@user_passes_test(is_manager, login_url='restaurateur:login')
+def view_orders_changes(request):
+    """Orders changed since the cursor. Orders which match the dashboard filter
+    come with a rendered table row, others have to be removed from the page."""
+    orders_filter = OrdersFilter(request.GET)
+    if not orders_filter.is_valid() or not orders_filter.cleaned_data['cursor']:
+        return JsonResponse({'error': 'Некорректные параметры фильтра'}, status=400,
+                            json_dumps_params={'ensure_ascii': False})
+
+    orders, cursor, has_more = load_changed_orders(
+        orders_filter.cleaned_data['cursor'], limit=settings.MANAGER_ORDERS_PAGE_SIZE,
+    )
+    shown_ids = set(
+        orders_filter.filter_orders(Order.objects.filter(id__in=[order.id for order in orders]))
+        .values_list('id', flat=True)
+    )
+    shown_orders = [order for order in orders if order.id in shown_ids]
+    add_order_details(shown_orders)
+
+    next_url = request.GET.get('next', reverse('restaurateur:view_orders'))
+    return JsonResponse({
+        'cursor': cursor,
+        'has_more': has_more,
+        'orders': [
+            {
+                'id': order.id,
+                'html': render_to_string('order_row.html', {'order': order, 'next_url': next_url})
+                if order.id in shown_ids else None,
+            }
+            for order in orders
+        ],
+    })
+
+
+@user_passes_test(is_manager, login_url='restaurateur:login')
+def view_orders_stream(request):
+    """Server-sent events about new orders and status transitions."""
+    subscription = get_broker().subscribe(request.headers.get('Last-Event-ID'))
+    response = StreamingHttpResponse(
+        stream_order_events(subscription,
+                            heartbeat=settings.ORDER_EVENTS_HEARTBEAT,
+                            duration=settings.ORDER_EVENTS_STREAM_DURATION),
+        content_type='text/event-stream',
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
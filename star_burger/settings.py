@@ -14,6 +14,16 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 SECRET_KEY = env('SECRET_KEY')
 DEBUG = env.bool('DEBUG', True)
 YANDEX_API_KEY = env.str('YANDEX_API_KEY')
+GEOCODER_BACKEND = env.str('GEOCODER_BACKEND', 'address.geocoders.YandexGeocoder')
+GEOCODER_FAKE_LATENCY = env.float('GEOCODER_FAKE_LATENCY', 0)
+GEOCODER_FAKE_BBOX = env.list('GEOCODER_FAKE_BBOX', [37.35, 55.55, 37.85, 55.92], subcast=float)
+GEOCODER_URL = env.str('GEOCODER_URL', 'https://geocode-maps.yandex.ru/1.x')
+GEOCODER_TIMEOUT = env.float('GEOCODER_TIMEOUT', 3)
+GEOCODER_DEADLINE = env.float('GEOCODER_DEADLINE', 5)
+GEOCODER_MAX_WORKERS = env.int('GEOCODER_MAX_WORKERS', 8)
+GEOCODER_CACHE_SIZE = env.int('GEOCODER_CACHE_SIZE', 10000)
+GEOCODER_CACHE_TTL = env.int('GEOCODER_CACHE_TTL', 30 * 24 * 60 * 60)
+GEOCODER_NOT_FOUND_TTL = env.int('GEOCODER_NOT_FOUND_TTL', 24 * 60 * 60)
 
 ALLOWED_HOSTS = env.list('ALLOWED_HOSTS', ['127.0.0.1', 'localhost'])
 
@@ -21,6 +31,7 @@ INSTALLED_APPS = [
     'foodcartapp.apps.FoodcartappConfig',
     'restaurateur.apps.RestaurateurConfig',
     'address.apps.AddressConfig',
+    'monitoring.apps.MonitoringConfig',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -35,11 +46,13 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'monitoring.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'monitoring.profiling.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'debug_toolbar.middleware.DebugToolbarMiddleware',
@@ -104,6 +117,43 @@ DATABASES = {
     )
 }
 
+CACHES = {
+    'default': env.dj_cache_url('CACHE_URL', 'locmem://'),
+}
+
+CATALOG_CACHE_TIMEOUT = env.int('CATALOG_CACHE_TIMEOUT', 60 * 60)
+BANNERS_CACHE_TIMEOUT = env.int('BANNERS_CACHE_TIMEOUT', 60 * 60)
+BANNERS_CACHE_MAX_AGE = env.int('BANNERS_CACHE_MAX_AGE', 5 * 60)
+
+ORDER_DISTANCE_DTYPE = env.str('ORDER_DISTANCE_DTYPE', 'float64')
+ORDER_DISTANCE_DECIMALS = env.int('ORDER_DISTANCE_DECIMALS', 2)
+ORDER_NEAREST_RESTAURANTS = env.int('ORDER_NEAREST_RESTAURANTS', 5) or None
+RESTAURANT_INDEX_CELL_SIZE = env.float('RESTAURANT_INDEX_CELL_SIZE', 0.05)
+RESTAURANT_INDEX_CACHE_TIMEOUT = env.int('RESTAURANT_INDEX_CACHE_TIMEOUT', 24 * 60 * 60)
+RESTAURANT_INDEX_LOCAL_TIMEOUT = env.int('RESTAURANT_INDEX_LOCAL_TIMEOUT', 60)
+METRICS_ALLOWED_IPS = env.list('METRICS_ALLOWED_IPS', ['127.0.0.1'])
+METRICS_TOKEN = env.str('METRICS_TOKEN', '')
+PROFILES_ROOT = env.str('PROFILES_ROOT', os.path.join(BASE_DIR, 'profiles'))
+PROFILES_KEEP = env.int('PROFILES_KEEP', 50)
+
+ORDERS_BULK_MAX_SIZE = env.int('ORDERS_BULK_MAX_SIZE', 1000)
+ORDER_INTAKE_ASYNC = env.bool('ORDER_INTAKE_ASYNC', False)
+IDEMPOTENCY_KEY_TTL = env.int('IDEMPOTENCY_KEY_TTL', 24 * 60 * 60)
+IDEMPOTENCY_LOCK_TIMEOUT = env.int('IDEMPOTENCY_LOCK_TIMEOUT', 60)
+IDEMPOTENCY_WAIT_TIMEOUT = env.float('IDEMPOTENCY_WAIT_TIMEOUT', 10)
+
+MANAGER_ORDERS_PAGE_SIZE = env.int('MANAGER_ORDERS_PAGE_SIZE', 50)
+MANAGER_ORDERS_POLL_INTERVAL = env.int('MANAGER_ORDERS_POLL_INTERVAL', 5)
+MANAGER_ORDERS_STREAM_POLL_INTERVAL = env.int('MANAGER_ORDERS_STREAM_POLL_INTERVAL', 60)
+MANAGER_ORDERS_CHANGES_WINDOW = env.int('MANAGER_ORDERS_CHANGES_WINDOW', 30)
+
+ORDER_EVENTS_BACKEND = env.str('ORDER_EVENTS_BACKEND', 'foodcartapp.order_events.InProcessBroker')
+ORDER_EVENTS_TTL = env.int('ORDER_EVENTS_TTL', 5 * 60)
+ORDER_EVENTS_POLL_INTERVAL = env.float('ORDER_EVENTS_POLL_INTERVAL', 1)
+ORDER_EVENTS_MAX_REPLAY = env.int('ORDER_EVENTS_MAX_REPLAY', 1000)
+ORDER_EVENTS_HEARTBEAT = env.int('ORDER_EVENTS_HEARTBEAT', 15)
+ORDER_EVENTS_STREAM_DURATION = env.int('ORDER_EVENTS_STREAM_DURATION', 5 * 60)
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
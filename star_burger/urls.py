@@ -21,6 +21,8 @@ from django.urls import path, include
 from django.shortcuts import render
 from django.conf import settings
 
+from monitoring.views import metrics_view
+
 
 def debug_rollbar(request):
     a = None
@@ -30,6 +32,7 @@ def debug_rollbar(request):
 
 urlpatterns = [
     path('rollbar/', debug_rollbar),
+    path('metrics', metrics_view),
     path('admin/', admin.site.urls),
     path('', render, kwargs={'template_name': 'index.html'}, name='start_page'),
     path('api-auth/', include('rest_framework.urls')),